@@ -1,6 +1,13 @@
 import mlflow
 import pandas as pd
+from mlflow.exceptions import MlflowException
+from src.feature_engineering import FeatureEngineer
+from src.handle_missing_values import FillMissingValuesStrategy
+from src.outlier_detection import OutlierDetector
 from steps.dynamic_importer import dynamic_importer
+from steps.feature_engineering_step import FEATURE_ENGINEERING_ARTIFACT
+from steps.handle_missing_values_step import MISSING_VALUES_ARTIFACT
+from steps.outlier_detection_step import OUTLIER_BOUNDS_ARTIFACT
 import logging
 import mlflow.sklearn
 
@@ -9,14 +16,22 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 
 class InferencePipeline:
-    def __init__(self, model_uri):
+    def __init__(self, model_uri, clip_outliers: bool = False):
         """
         Initialize the inference pipeline by loading the model.
 
         :param model_uri: The URI of the model to load.
+        :param clip_outliers: clip the inputs to the fitted outlier bounds. Off by
+                              default since the model is trained on unclipped data,
+                              the rows outside the bounds are only flagged.
         """
         self.model_uri = model_uri
+        self.clip_outliers = clip_outliers
         self.model = self._load_model()
+        self.run_id = mlflow.models.get_model_info(model_uri).run_id
+        self.missing_values_strategy = self._load_missing_values_strategy()
+        self.feature_engineer = self._load_feature_engineer()
+        self.outlier_detector = self._load_outlier_detector()
 
     def _load_model(self):
         """
@@ -29,6 +44,48 @@ class InferencePipeline:
         logging.info("Model loaded successfully")
         return model
 
+    def _load_missing_values_strategy(self):
+        """
+        Loads the fill values fitted during training from the run of the deployed model.
+
+        :return: fitted FillMissingValuesStrategy, or None if the run has none.
+        """
+        try:
+            params = mlflow.artifacts.load_dict(f"runs:/{self.run_id}/{MISSING_VALUES_ARTIFACT}")
+        except MlflowException:
+            logging.warning("No fitted missing values statistics found, serving without them")
+            return None
+        logging.info("Missing values statistics loaded successfully")
+        return FillMissingValuesStrategy.from_dict(params)
+
+    def _load_feature_engineer(self):
+        """
+        Loads the feature engineering plan fitted during training from the run of the deployed model.
+
+        :return: fitted FeatureEngineer, or None if the run has none.
+        """
+        try:
+            plan_path = mlflow.artifacts.download_artifacts(f"runs:/{self.run_id}/{FEATURE_ENGINEERING_ARTIFACT}")
+        except MlflowException:
+            logging.warning("No fitted feature engineering plan found, serving without it")
+            return None
+        logging.info("Feature engineering plan loaded successfully")
+        return FeatureEngineer.load(plan_path)
+
+    def _load_outlier_detector(self):
+        """
+        Loads the outlier bounds fitted during training from the run of the deployed model.
+
+        :return: fitted OutlierDetector, or None if the run has none.
+        """
+        try:
+            params = mlflow.artifacts.load_dict(f"runs:/{self.run_id}/{OUTLIER_BOUNDS_ARTIFACT}")
+        except MlflowException:
+            logging.warning("No fitted outlier bounds found, serving without them")
+            return None
+        logging.info("Outlier bounds loaded successfully")
+        return OutlierDetector.from_dict(params)
+
     def run_inference(self, batch_data):
         """
         Runs inference on the batch data using the loaded model.
@@ -38,6 +95,16 @@ class InferencePipeline:
         :return: Model inference.
         """
         logging.info("Running inference on batch data")
+        if self.missing_values_strategy is not None:
+            batch_data = self.missing_values_strategy.transform(batch_data)
+        if self.outlier_detector is not None:
+            flagged = self.outlier_detector.apply(batch_data, action="flag")
+            if flagged.any():
+                logging.warning(f"{int(flagged.sum())} of {len(flagged)} rows outside the training bounds")
+            if self.clip_outliers:
+                batch_data = self.outlier_detector.apply(batch_data, action="clip")
+        if self.feature_engineer is not None:
+            batch_data = self.feature_engineer.transform(batch_data)
         preds = self.model.predict(batch_data)
         logging.info(f"Predictions: {preds}")
         return preds
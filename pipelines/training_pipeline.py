@@ -5,6 +5,8 @@ from steps.data_ingestion_step import data_ingestion_step
 from steps.data_splitter_step import data_splitter_step
 from steps.handle_missing_values_step import handle_missing_values
 from steps.feature_engineering_step import apply_feature_engineering
+from steps.outlier_detection_step import fit_outlier_detector
+from steps.cross_validation_step import cross_validation_step
 from steps.model_building_step import model_building_step
 from steps.model_evaluation_step import model_evaluation_step
 
@@ -38,12 +40,17 @@ def training_pipeline():
         mlflow.set_tag("description", "An experiment to predict house prices using linear regression and log strategy for feature engineering.")
 
         # 1. Data Ingestion
-        raw_data = data_ingestion_step(file_path=os.getenv('FILE_PATH'))
+        raw_data = data_ingestion_step(file_path=os.getenv('FILE_PATH'),
+                                       cache_dir=os.getenv('CACHE_DIR'),
+                                       schema_path=os.getenv('SCHEMA_PATH'))
         mlflow.log_param("file_path", os.getenv('FILE_PATH'))
 
         # 2. Handling Missing Values step
         cleaned_data = handle_missing_values(df=raw_data)
 
+        # Fit the outlier bounds used to guard the serving inputs
+        fit_outlier_detector(df=cleaned_data, strategy="iqr", exclude_columns=["Order", "PID", "SalePrice"])
+
         # 3. Feature Engineering
         transformed_data = apply_feature_engineering(df=cleaned_data,
                                                      strategy="log",
@@ -51,6 +58,10 @@ def training_pipeline():
                                                      noise_features=["Order", "PID"])
         mlflow.log_param("feature_engineering_strategy", "log")
 
+        # Cross-validating the candidate models, logged as cv metrics
+        cross_validation_step(df=transformed_data, target_column="SalePrice",
+                              cache_dir=os.getenv('CACHE_DIR'))
+
         # 4. Data splitting step
         X_train, X_test, y_train, y_test = data_splitter_step(df=transformed_data, target_column="SalePrice")
 
@@ -59,7 +70,7 @@ def training_pipeline():
         mlflow.log_param("X_test_shape", X_test.shape)
 
         # 5. Model building step
-        trained_model = model_building_step(X_train, y_train)
+        trained_model = model_building_step(X_train, y_train, cache_dir=os.getenv('CACHE_DIR'))
         logging.info("Model training completed.")
 
         # 6. Model Evaluation step
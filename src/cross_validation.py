@@ -0,0 +1,114 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from joblib import Memory
+from sklearn.base import TransformerMixin, clone
+
+from src.model_evaluator import ModelEvaluator, RegressionModelEvaluationStrategy
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+# data shared by the process pool workers, set once per worker by the initializer
+_FOLD_DATA = {}
+
+
+def data_fingerprint(*data) -> str:
+    """
+    Content hash of dataframes, series or arrays, computed with pandas'
+    vectorized row hashing so it is cheap compared to refitting on them
+    """
+    digest = hashlib.sha256()
+    for item in data:
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(item).to_numpy().tobytes())
+            digest.update(repr(list(item.columns) if isinstance(item, pd.DataFrame) else item.name).encode())
+        else:
+            digest.update(np.ascontiguousarray(item).tobytes())
+    return digest.hexdigest()
+
+
+def _init_fold_worker(X: pd.DataFrame, y: pd.Series, preprocessor: TransformerMixin, cache_dir: str,
+                      fingerprint: str):
+    _FOLD_DATA["X"] = X
+    _FOLD_DATA["y"] = y
+    _FOLD_DATA["preprocessor"] = preprocessor
+    # the frames are identified by their fingerprint rather than hashed again by joblib
+    _FOLD_DATA["fit_transform"] = Memory(cache_dir, verbose=0).cache(
+        fit_transform_fold, ignore=["X_train", "X_test"]
+    )
+    _FOLD_DATA["fingerprint"] = fingerprint
+
+
+def fit_transform_fold(preprocessor: TransformerMixin, X_train: pd.DataFrame, X_test: pd.DataFrame,
+                       fingerprint: str = None):
+    """
+    Fits a fresh copy of the preprocessor on the train rows of a fold
+    and transforms both sides of it
+
+    :param fingerprint: identifies the fold data in the transform cache
+    :return: transformed train and test matrices
+    """
+    preprocessor = clone(preprocessor)
+    return preprocessor.fit_transform(X_train), preprocessor.transform(X_test)
+
+
+def _evaluate_fold(fold: int, train_index: np.ndarray, test_index: np.ndarray, models: dict) -> list:
+    X, y = _FOLD_DATA["X"], _FOLD_DATA["y"]
+    y_train, y_test = y.iloc[train_index], y.iloc[test_index]
+
+    fingerprint = _FOLD_DATA["fingerprint"]
+    if fingerprint is not None:
+        fingerprint = data_fingerprint(fingerprint.encode(), train_index, test_index)
+    # preprocessing is fitted once per fold, or read back from the cache, and shared by every model
+    X_train, X_test = _FOLD_DATA["fit_transform"](
+        _FOLD_DATA["preprocessor"], X.iloc[train_index], X.iloc[test_index], fingerprint=fingerprint
+    )
+
+    evaluator = ModelEvaluator(strategy=RegressionModelEvaluationStrategy())
+    results = []
+    for name, model in models.items():
+        model = clone(model).fit(X_train, y_train)
+        results.append({"fold": fold, "model": name, **evaluator.evaluate(model, X_test, y_test)})
+    return results
+
+
+def cross_validate_models(X: pd.DataFrame, y: pd.Series, splits, preprocessor: TransformerMixin,
+                          models: dict, max_workers: int = None, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Evaluates several models on every fold of a cross-validation,
+    one fold per task of a process pool
+
+    :param X: feature set
+    :param y: target/label set
+    :param splits: iterable of train and test row positions, e.g. DataSplitter.split_indices
+    :param preprocessor: unfitted transformer, fitted once on the train rows of each fold
+    :param models: unfitted regressors by name, all trained on the same transformed fold
+    :param max_workers: size of the process pool
+    :param cache_dir: directory of a joblib cache of the fitted fold transforms,
+                      so runs on the same folds skip preprocessing
+    :return: dataframe with the metrics of every model on every fold
+    """
+    logging.info(f"Cross-validating models: {list(models)}.")
+    # hashed once here rather than in every worker, and only when there is a cache to key
+    fingerprint = data_fingerprint(X) if cache_dir else None
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_fold_worker,
+                             initargs=(X, y, preprocessor, cache_dir, fingerprint)) as executor:
+        futures = [
+            executor.submit(_evaluate_fold, fold, train_index, test_index, models)
+            for fold, (train_index, test_index) in enumerate(splits)
+        ]
+        results = [row for future in futures for row in future.result()]
+
+    logging.info("Cross-validation completed.")
+    return pd.DataFrame(results)
+
+
+def summarize_cross_validation(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mean and standard deviation of every metric across the folds, per model
+    """
+    return results.drop(columns=["fold"]).groupby("model").agg(["mean", "std"])
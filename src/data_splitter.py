@@ -1,9 +1,14 @@
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
 from abc import ABC, abstractmethod
 import logging
 
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold, ShuffleSplit
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -21,6 +26,35 @@ class DataSplittingStrategy(ABC):
         """
         pass
 
+    @abstractmethod
+    def split_indices(self, df: pd.DataFrame, target_column: str):
+        """
+        abstract method yielding the integer positions of the
+        train and test rows of every split, without copying data
+        """
+        pass
+
+    def split_folds(self, df: pd.DataFrame, target_column: str):
+        """
+        Yields the train and test sets of every split,
+        one split materialized at a time
+        """
+        for train_index, test_index in self.split_indices(df, target_column):
+            yield take_split(df, target_column, train_index, test_index)
+
+
+def take_split(df: pd.DataFrame, target_column: str, train_index: np.ndarray, test_index: np.ndarray):
+    """
+    Materializes a split from row positions, taking the rows and the
+    feature columns in one indexing pass per partition instead of
+    copying the whole frame to drop the target first
+    """
+    feature_positions = np.flatnonzero(df.columns != target_column)
+    y = df[target_column]
+
+    return (df.iloc[train_index, feature_positions], df.iloc[test_index, feature_positions],
+            y.iloc[train_index], y.iloc[test_index])
+
 
 class SimpleTrainTestSplitStrategy(DataSplittingStrategy):
     """
@@ -34,24 +68,326 @@ class SimpleTrainTestSplitStrategy(DataSplittingStrategy):
         self.test_size = test_size
         self.random_state = random_state
 
+    def split_indices(self, df: pd.DataFrame, target_column: str):
+        """
+        Yields the train and test row positions of the split,
+        the same rows sklearn's train_test_split would pick
+        """
+        yield from ShuffleSplit(
+            n_splits=1, test_size=self.test_size, random_state=self.random_state
+        ).split(df)
+
     def split_data(self, df: pd.DataFrame, target_column: str):
         """
         Splits the provided data into train and tests set
         using sklearn framework
         """
         logging.info("Performing simple train-test split.")
-        X = df.drop(columns=[target_column])
-        y = df[target_column]
+        train_index, test_index = next(self.split_indices(df, target_column))
+        X_train, X_test, y_train, y_test = take_split(df, target_column, train_index, test_index)
+
+        logging.info("Train-test split completed.")
+
+        return X_train, X_test, y_train, y_test
+
+
+class KFoldStrategy(DataSplittingStrategy):
+    """
+    Implements K-fold cross-validation splits, generated lazily
+    """
+    def __init__(self, n_splits: int = 5, shuffle: bool = True, random_state: int = 101):
+        """
+        Initializes the KFoldStrategy
+        with specified parameters
+        """
+        self.n_splits = n_splits
+        self.shuffle = shuffle
+        self.random_state = random_state
+
+    def split_indices(self, df: pd.DataFrame, target_column: str):
+        """
+        Yields the train and test row positions of every fold
+        """
+        yield from KFold(
+            n_splits=self.n_splits, shuffle=self.shuffle,
+            random_state=self.random_state if self.shuffle else None
+        ).split(df)
+
+    def split_data(self, df: pd.DataFrame, target_column: str):
+        """
+        Splits the provided data into the train and test sets of the
+        first fold, split_folds yields every fold
+        """
+        logging.info(f"Performing {self.n_splits}-fold split.")
+        train_index, test_index = next(self.split_indices(df, target_column))
+        X_train, X_test, y_train, y_test = take_split(df, target_column, train_index, test_index)
+
+        logging.info("Train-test split completed.")
+
+        return X_train, X_test, y_train, y_test
+
+
+def counting_argsort(keys: np.ndarray) -> np.ndarray:
+    """
+    Stable argsort of small non-negative integer keys such as group
+    codes or month numbers. numpy sorts integers of 16 bits or less
+    with a radix sort, so the keys are narrowed when their range fits
+    and the sort stays linear in the number of rows.
+    """
+    keys = np.asarray(keys)
+    if len(keys) and keys.max() < 2 ** 16:
+        keys = keys.astype(np.uint16)
+    return np.argsort(keys, kind="stable")
+
+
+class IndexedSplitStrategy(DataSplittingStrategy):
+    """
+    Base class of the strategies splitting on a per-row fold number.
+    The fold index is computed once from a sort or group-by of the
+    data, kept on the instance and optionally persisted, then every
+    fold is read off it with a linear scan.
+    """
+    def __init__(self, index_path: str = None):
+        """
+        :param index_path: file the fold index is cached in across runs, with its key
+        """
+        self.index_path = index_path
+        self.folds = None
+        self.index_key = None
+
+    @abstractmethod
+    def key_columns(self, target_column: str) -> list:
+        """
+        abstract method returning the columns the fold index is computed from
+        """
+        pass
+
+    @abstractmethod
+    def compute_folds(self, df: pd.DataFrame, target_column: str) -> np.ndarray:
+        """
+        abstract method returning the fold number of every row
+        """
+        pass
+
+    @abstractmethod
+    def test_folds(self) -> list:
+        """
+        abstract method returning the fold used as test set by every split
+        """
+        pass
 
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=self.test_size, random_state=self.random_state
-        )
+    def train_mask(self, folds: np.ndarray, test_fold: int) -> np.ndarray:
+        """
+        Rows used for training when test_fold is held out, all the other folds by default
+        """
+        return folds != test_fold
+
+    def fold_key(self, df: pd.DataFrame, target_column: str) -> str:
+        """
+        Fingerprint of the key columns of df, in row order, and of the
+        strategy parameters, identifying the fold index they produce
+        """
+        columns = self.key_columns(target_column)
+        params = {name: value for name, value in vars(self).items()
+                  if name not in ("index_path", "folds", "index_key")}
+        digest = hashlib.sha256(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+        digest.update(json.dumps(
+            {"strategy": type(self).__name__, "columns": columns, "params": params}, sort_keys=True, default=str
+        ).encode())
+        return digest.hexdigest()
+
+    def fold_index(self, df: pd.DataFrame, target_column: str) -> np.ndarray:
+        """
+        Returns the fold index of df, computing it only when no cached
+        index was built from the same key columns and parameters
+        """
+        index_key = self.fold_key(df, target_column)
+        if self.folds is not None and self.index_key == index_key:
+            return self.folds
+
+        if self.index_path is not None and os.path.exists(self.index_path):
+            with np.load(self.index_path) as saved:
+                if str(saved["key"]) == index_key:
+                    logging.info(f"Loaded split index from {self.index_path}.")
+                    self.folds, self.index_key = saved["folds"], index_key
+                    return self.folds
+
+        logging.info("Computing split index.")
+        self.folds, self.index_key = self.compute_folds(df, target_column), index_key
+        if self.index_path is not None:
+            # written through a handle so numpy keeps the given file name
+            with open(self.index_path, "wb") as file:
+                np.savez(file, folds=self.folds, key=index_key)
+        return self.folds
+
+    def split_indices(self, df: pd.DataFrame, target_column: str):
+        """
+        Yields the train and test row positions of every split
+        """
+        folds = self.fold_index(df, target_column)
+        for test_fold in self.test_folds():
+            yield np.flatnonzero(self.train_mask(folds, test_fold)), np.flatnonzero(folds == test_fold)
+
+    def split_data(self, df: pd.DataFrame, target_column: str):
+        """
+        Splits the provided data into the train and test sets of the first split
+        """
+        logging.info(f"Performing {type(self).__name__} split.")
+        train_index, test_index = next(self.split_indices(df, target_column))
+        X_train, X_test, y_train, y_test = take_split(df, target_column, train_index, test_index)
 
         logging.info("Train-test split completed.")
 
         return X_train, X_test, y_train, y_test
 
 
+class TimeOrderedSplitStrategy(IndexedSplitStrategy):
+    """
+    Implements splits where the model is always tested on sales that
+    happened after the ones it was trained on
+    """
+    def __init__(self, year_column: str = "Yr Sold", month_column: str = "Mo Sold", test_size: float = 0.2,
+                 n_splits: int = 1, index_path: str = None):
+        """
+        :param test_size: share of the latest sales held out, used when n_splits is 1
+        :param n_splits: number of expanding-window splits, as in sklearn's TimeSeriesSplit
+        """
+        super().__init__(index_path)
+        self.year_column = year_column
+        self.month_column = month_column
+        self.test_size = test_size
+        self.n_splits = n_splits
+
+    def key_columns(self, target_column: str) -> list:
+        return [self.year_column, self.month_column]
+
+    def compute_folds(self, df: pd.DataFrame, target_column: str) -> np.ndarray:
+        months = (df[self.year_column] * 12 + df[self.month_column] - 1).to_numpy(dtype=np.float64)
+        months = np.nan_to_num(months, nan=np.nanmin(months)).astype(np.int64)
+        order = counting_argsort(months - months.min())
+
+        n_rows = len(order)
+        positions = np.arange(n_rows)
+        if self.n_splits == 1:
+            block = (positions >= n_rows - int(np.ceil(self.test_size * n_rows))).astype(np.int16)
+        else:
+            block = (positions * (self.n_splits + 1) // n_rows).astype(np.int16)
+
+        # rows sold in the same month share the block of the first of them
+        sorted_months = months[order]
+        first = np.zeros(n_rows, dtype=np.int64)
+        starts = np.flatnonzero(np.diff(sorted_months)) + 1
+        first[starts] = starts
+        block = block[np.maximum.accumulate(first)]
+
+        folds = np.empty(n_rows, dtype=np.int16)
+        folds[order] = block
+
+        if (np.bincount(folds, minlength=self.n_splits + 1) == 0).any():
+            raise ValueError(
+                f"Cannot make {self.n_splits} time-ordered splits without cutting through a month, "
+                "too few distinct sale months."
+            )
+        return folds
+
+    def test_folds(self) -> list:
+        return list(range(1, self.n_splits + 1))
+
+    def train_mask(self, folds: np.ndarray, test_fold: int) -> np.ndarray:
+        return folds < test_fold
+
+
+class GroupedSplitStrategy(IndexedSplitStrategy):
+    """
+    Implements splits where every group, e.g. a neighborhood,
+    is entirely in the train set or entirely in the test set
+    """
+    def __init__(self, group_column: str = "Neighborhood", n_splits: int = 5, index_path: str = None):
+        """
+        :param n_splits: number of folds, each holding out about 1/n_splits of the rows
+        """
+        super().__init__(index_path)
+        self.group_column = group_column
+        self.n_splits = n_splits
+
+    def key_columns(self, target_column: str) -> list:
+        return [self.group_column]
+
+    def compute_folds(self, df: pd.DataFrame, target_column: str) -> np.ndarray:
+        codes, groups = pd.factorize(df[self.group_column], use_na_sentinel=False)
+        if len(groups) < self.n_splits:
+            raise ValueError(
+                f"Cannot have number of splits n_splits={self.n_splits} greater than "
+                f"the number of groups: {len(groups)}."
+            )
+        sizes = np.bincount(codes, minlength=len(groups))
+
+        # largest groups first, each to the fold with the fewest rows so far, as GroupKFold does
+        group_folds = np.empty(len(groups), dtype=np.int16)
+        fold_sizes = np.zeros(self.n_splits, dtype=np.int64)
+        for group in np.argsort(sizes, kind="stable")[::-1]:
+            fold = np.argmin(fold_sizes)
+            group_folds[group] = fold
+            fold_sizes[fold] += sizes[group]
+
+        return group_folds[codes]
+
+    def test_folds(self) -> list:
+        return list(range(self.n_splits))
+
+
+class StratifiedSplitStrategy(IndexedSplitStrategy):
+    """
+    Implements random splits that keep the distribution of the
+    target, binned on its quantiles, the same in every set
+    """
+    def __init__(self, n_bins: int = 10, test_size: float = 0.2, n_splits: int = 1, random_state: int = 101,
+                 index_path: str = None):
+        """
+        :param n_bins: number of quantile bins of the target
+        :param test_size: share of every bin held out, used when n_splits is 1
+        :param n_splits: number of stratified folds
+        """
+        super().__init__(index_path)
+        self.n_bins = n_bins
+        self.test_size = test_size
+        self.n_splits = n_splits
+        self.random_state = random_state
+
+    def key_columns(self, target_column: str) -> list:
+        return [target_column]
+
+    def compute_folds(self, df: pd.DataFrame, target_column: str) -> np.ndarray:
+        target = df[target_column].to_numpy(dtype=np.float64)
+        # np.quantile selects with a partition, no full sort of the target
+        edges = np.nanquantile(target, np.linspace(0, 1, self.n_bins + 1)[1:-1])
+        bins = np.searchsorted(edges, target, side="right")
+
+        # rank of every row within its bin, in random order
+        rows = np.random.default_rng(self.random_state).permutation(len(target))
+        rows = rows[counting_argsort(bins[rows])]
+        counts = np.bincount(bins, minlength=self.n_bins)
+        starts = np.cumsum(counts) - counts
+        rank = np.empty(len(target), dtype=np.int64)
+        rank[rows] = np.arange(len(target)) - starts[bins[rows]]
+
+        if self.n_splits == 1:
+            # fold 0 holds the first test_size share of every bin
+            folds = (rank >= np.round(self.test_size * counts)[bins]).astype(np.int16)
+        else:
+            folds = (rank % self.n_splits).astype(np.int16)
+
+        if (np.bincount(folds, minlength=max(self.n_splits, 2)) == 0).any():
+            raise ValueError(
+                f"Cannot make {self.n_splits} stratified splits of {len(target)} rows "
+                f"with test_size={self.test_size}, a train or test set would be empty."
+            )
+        return folds
+
+    def test_folds(self) -> list:
+        return list(range(self.n_splits))
+
+
 class DataSplitter:
     """
     Context class for using data splitting strategies
@@ -78,4 +414,22 @@ class DataSplitter:
         the provided data into train-test split
         """
         logging.info("Splitting data using current strategy.")
-        return self.strategy.split_data(df, target_column)
\ No newline at end of file
+        return self.strategy.split_data(df, target_column)
+
+
+    def split_indices(self, df: pd.DataFrame, target_column: str):
+        """
+        Execute the current strategy to generate the
+        row positions of the splits without copying data
+        """
+        logging.info("Generating split indices using current strategy.")
+        return self.strategy.split_indices(df, target_column)
+
+
+    def split_folds(self, df: pd.DataFrame, target_column: str):
+        """
+        Execute the current strategy to generate the
+        train-test sets of every split lazily
+        """
+        logging.info("Generating splits using current strategy.")
+        return self.strategy.split_folds(df, target_column)
@@ -1,67 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import logging
 
 from abc import ABC, abstractmethod
 
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, OneHotEncoder
+from sklearn.utils import murmurhash3_32
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
+def map_features(function, features: list, max_workers: int = None) -> dict:
+    """
+    Applies function to every feature, dealing the features out
+    round-robin across a thread pool. NumPy releases the GIL in
+    its element-wise kernels, so independent columns run concurrently.
+    """
+    if not max_workers or len(features) < 2:
+        return {feature: function(feature) for feature in features}
+
+    n_partitions = min(max_workers, len(features))
+    partitions = [features[i::n_partitions] for i in range(n_partitions)]
+    with ThreadPoolExecutor(max_workers=n_partitions) as executor:
+        results = executor.map(
+            lambda partition: {feature: function(feature) for feature in partition}, partitions
+        )
+        return {feature: values for result in results for feature, values in result.items()}
+
+
+def sparse_columns(df: pd.DataFrame) -> list:
+    """Columns stored as pandas sparse arrays, e.g. the output of the sparse encoders"""
+    return [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+
+
+def sparse_frame_to_csr(df: pd.DataFrame) -> sp.csr_matrix:
+    """
+    Converts a frame of sparse columns to CSR without densifying it, so
+    encoded features reach sklearn estimators as a sparse matrix
+    """
+    return df.sparse.to_coo().tocsr()
+
+
 class FeatureEngineeringStrategy(ABC):
     @abstractmethod
+    def fit(self, df: pd.DataFrame):
+        pass
+
+    @abstractmethod
+    def transform(self, df: pd.DataFrame):
+        pass
+
     def apply_transformation(self, df: pd.DataFrame):
+        return self.fit(df).transform(df)
+
+
+class ColumnwiseFeatureEngineeringStrategy(FeatureEngineeringStrategy):
+    """
+    Strategy transforming each of its features independently. The
+    column kernel lets CompositeFeatureEngineering chain several such
+    strategies over one working array per column.
+    """
+
+    features: list
+
+    @abstractmethod
+    def transform_column(self, feature: str, values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """Transforms the values of one fitted feature, writing into out when given"""
         pass
 
+    def apply_transformation(self, df: pd.DataFrame, max_workers: int = None):
+        return self.fit(df).transform(df, max_workers=max_workers)
+
+    def transform_columns(self, df: pd.DataFrame, max_workers: int = None):
+        # features absent at serving time (e.g. the target) are skipped
+        sources = {feature: df[feature].to_numpy() for feature in self.features if feature in df.columns}
+        columns = map_features(
+            lambda feature: self.transform_column(feature, sources[feature]), list(sources), max_workers
+        )
+
+        # a shallow copy shares the untouched columns, assigning replaces the transformed ones
+        df_transformed = df.copy(deep=False)
+        for feature, values in columns.items():
+            df_transformed[feature] = values
+        return df_transformed
 
-class LogTransformation(FeatureEngineeringStrategy):
+
+class LogTransformation(ColumnwiseFeatureEngineeringStrategy):
 
     def __init__(self, features: list):
         self.features = features
 
-    def apply_transformation(self, df: pd.DataFrame):
+    def fit(self, df: pd.DataFrame):
+        # stateless, nothing to learn
+        return self
+
+    def transform_column(self, feature: str, values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return np.log1p(values, out=out)
+
+    def transform(self, df: pd.DataFrame, max_workers: int = None):
         logging.info(f"Applying log transformation to features: {self.features}")
 
-        df_transformed = df.copy()
-        for feature in self.features:
-            df_transformed[feature] = np.log1p(
-                df[feature]
-            )
+        df_transformed = self.transform_columns(df, max_workers)
 
         logging.info("Log transformation completed.")
 
         return df_transformed
 
 
-class StandardScaling(FeatureEngineeringStrategy):
+class StandardScaling(ColumnwiseFeatureEngineeringStrategy):
 
     def __init__(self, features: list):
         self.features = features
         self.scaler = StandardScaler()
 
-    def apply_transformation(self, df: pd.DataFrame):
+    def fit(self, df: pd.DataFrame):
+        logging.info(f"Fitting standard scaling on features: {self.features}")
+        self.scaler.fit(df[self.features])
+        return self
+
+    def transform_column(self, feature: str, values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        position = self.features.index(feature)
+        out = np.subtract(values, self.scaler.mean_[position], out=out)
+        return np.divide(out, self.scaler.scale_[position], out=out)
+
+    def transform(self, df: pd.DataFrame, max_workers: int = None):
         logging.info(f"Applying standard scaling to features: {self.features}")
 
-        df_transformed = df.copy()
-        df_transformed[self.features] = self.scaler.fit_transform(df_transformed[self.features])
+        df_transformed = self.transform_columns(df, max_workers)
 
         logging.info("Standard scaling completed.")
 
         return df_transformed
 
 
-class MinMaxScaling(FeatureEngineeringStrategy):
+class MinMaxScaling(ColumnwiseFeatureEngineeringStrategy):
 
     def __init__(self, features: list):
         self.features = features
         self.scaler = MinMaxScaler()
 
-    def apply_transformation(self, df: pd.DataFrame):
+    def fit(self, df: pd.DataFrame):
+        logging.info(f"Fitting min-max scaling on features: {self.features}")
+        self.scaler.fit(df[self.features])
+        return self
+
+    def transform_column(self, feature: str, values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        position = self.features.index(feature)
+        out = np.multiply(values, self.scaler.scale_[position], out=out)
+        return np.add(out, self.scaler.min_[position], out=out)
+
+    def transform(self, df: pd.DataFrame, max_workers: int = None):
         logging.info(f"Applying min-max scaling to features: {self.features}")
 
-        df_transformed = df.copy()
-        df_transformed[self.features] = self.scaler.fit_transform(df_transformed[self.features])
+        df_transformed = self.transform_columns(df, max_workers)
 
         logging.info("Min-Max scaling completed.")
 
@@ -70,31 +165,168 @@ class MinMaxScaling(FeatureEngineeringStrategy):
 
 class OneHotEncoding(FeatureEngineeringStrategy):
 
-    def __init__(self, features: list):
+    def __init__(self, features: list, sparse: bool = False):
         self.features = features
-        self.encoder = OneHotEncoder(sparse=False, drop='first')
+        self.sparse = sparse
+        # levels unseen during fit are encoded as all zeros at serving time
+        self.encoder = OneHotEncoder(sparse_output=sparse, drop='first', handle_unknown='ignore')
 
-    def apply_transformation(self, df: pd.DataFrame):
+    def fit(self, df: pd.DataFrame):
+        logging.info(f"Fitting one-hot encoding on features: {self.features}")
+        self.encoder.fit(df[self.features])
+        return self
+
+    def transform(self, df: pd.DataFrame):
         logging.info(f"Applying one-hot encoding to features: {self.features}")
 
-        df_transformed = df.copy()
-        encoded_df = pd.DataFrame(
-            self.encoder.fit_transform(df_transformed[self.features]),
-            columns=self.encoder.get_feature_names_out(self.features)
-        )
+        encoded = self.encoder.transform(df[self.features])
+        columns = self.encoder.get_feature_names_out(self.features)
+        if self.sparse:
+            # sparse columns only store the non-zero indicators
+            encoded_df = pd.DataFrame.sparse.from_spmatrix(encoded, index=df.index, columns=columns)
+        else:
+            encoded_df = pd.DataFrame(encoded, columns=columns, index=df.index)
 
-        df_transformed = df_transformed.drop(columns=self.features)
-        df_transformed = pd.concat([df_transformed, encoded_df], axis=1)
+        # drop already returns a new frame, no upfront copy needed
+        df_transformed = df.drop(columns=self.features)
+        df_transformed = pd.concat([df_transformed, encoded_df], axis=1, copy=False)
 
         logging.info("One-hot encoding completed.")
 
         return df_transformed
 
 
+class HashingEncoding(FeatureEngineeringStrategy):
+    """
+    Encodes categorical features with the hashing trick into a fixed
+    number of sparse columns, whatever their cardinality. Each
+    "feature=value" token is hashed like sklearn's FeatureHasher, with
+    the sign of the hash as the value to limit the bias of collisions.
+    Only the distinct values of a column are hashed. The sparse columns
+    reach the model as CSR, the preprocessor never densifies them.
+    """
+
+    def __init__(self, features: list, n_features: int = 1024, prefix: str = None):
+        """
+        :param prefix: name prefix of the hashed columns, the joined feature names
+                       by default so several hashing steps never collide
+        """
+        self.features = features
+        self.n_features = n_features
+        self.prefix = prefix if prefix is not None else "_".join(features)
+
+    def fit(self, df: pd.DataFrame):
+        # stateless, the hash function fixes the encoding
+        return self
+
+    def transform(self, df: pd.DataFrame):
+        logging.info(f"Applying hashing encoding to features: {self.features}")
+
+        rows, columns, values = [], [], []
+        for feature in self.features:
+            codes, uniques = pd.factorize(df[feature])
+            hashes = np.array(
+                [murmurhash3_32(f"{feature}={value}", seed=0) for value in uniques], dtype=np.int64
+            )
+            # missing values (code -1) leave the row empty for this feature
+            observed = np.flatnonzero(codes >= 0)
+            feature_hashes = hashes[codes[observed]]
+            rows.append(observed)
+            columns.append(np.abs(feature_hashes) % self.n_features)
+            values.append(np.where(feature_hashes >= 0, 1.0, -1.0))
+
+        # colliding tokens of the same row are summed, as FeatureHasher does
+        hashed = sp.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+            shape=(len(df), self.n_features)
+        )
+        hashed_df = pd.DataFrame.sparse.from_spmatrix(
+            hashed, index=df.index, columns=[f"{self.prefix}_hash_{i}" for i in range(self.n_features)]
+        )
+
+        df_transformed = df.drop(columns=self.features)
+        df_transformed = pd.concat([df_transformed, hashed_df], axis=1, copy=False)
+
+        logging.info("Hashing encoding completed.")
+
+        return df_transformed
+
+
+class CompositeFeatureEngineering(FeatureEngineeringStrategy):
+    """
+    Applies an ordered list of strategies as one fused pass. Runs of
+    consecutive column-wise strategies are planned per column: each
+    transformed column is allocated once and every later step of its
+    chain works in place on that array, while untouched columns are
+    shared with the input instead of copied. Other strategies (e.g.
+    encoders) run in order between those runs.
+    """
+
+    def __init__(self, strategies: list):
+        self.strategies = strategies
+
+    def fit(self, df: pd.DataFrame, max_workers: int = None):
+        self._run(df, fit=True, max_workers=max_workers)
+        return self
+
+    def transform(self, df: pd.DataFrame, max_workers: int = None):
+        return self._run(df, fit=False, max_workers=max_workers)
+
+    def apply_transformation(self, df: pd.DataFrame, max_workers: int = None):
+        # fitting already produces the transformed frame, no second pass needed
+        return self._run(df, fit=True, max_workers=max_workers)
+
+    def _run(self, df: pd.DataFrame, fit: bool, max_workers: int = None):
+        columnwise_run = []
+        for strategy in self.strategies + [None]:
+            if isinstance(strategy, ColumnwiseFeatureEngineeringStrategy):
+                columnwise_run.append(strategy)
+                continue
+            if columnwise_run:
+                df = self._run_columnwise(df, columnwise_run, fit, max_workers)
+                columnwise_run = []
+            if strategy is not None:
+                df = strategy.apply_transformation(df) if fit else strategy.transform(df)
+        return df
+
+    @staticmethod
+    def _run_columnwise(df: pd.DataFrame, strategies: list, fit: bool, max_workers: int = None):
+        logging.info(f"Applying {len(strategies)} column-wise strategies in one fused pass.")
+
+        columns = {}
+        for strategy in strategies:
+            features = [feature for feature in strategy.features if feature in df.columns]
+            if fit:
+                # later steps are fitted on the output of the earlier ones
+                strategy.fit(pd.DataFrame(
+                    {feature: columns.get(feature, df[feature]) for feature in features}, index=df.index
+                ))
+
+            sources = {feature: df[feature].to_numpy() for feature in features if feature not in columns}
+
+            def transform_feature(feature, strategy=strategy):
+                if feature in sources:
+                    return strategy.transform_column(feature, sources[feature])
+                return strategy.transform_column(feature, columns[feature], out=columns[feature])
+
+            columns.update(map_features(transform_feature, features, max_workers))
+
+        df_transformed = df.copy(deep=False)
+        for feature, values in columns.items():
+            df_transformed[feature] = values
+        return df_transformed
+
+
 class FeatureEngineer:
-    def __init__(self, strategy: FeatureEngineeringStrategy, noise_features: list = None):
+    def __init__(self, strategy: FeatureEngineeringStrategy, noise_features: list = None,
+                 max_workers: int = None):
+        """
+        :param max_workers: size of the thread pool the features of column-wise
+                            strategies are partitioned across, serial if None
+        """
         self.strategy = strategy
         self.noise_features = noise_features
+        self.max_workers = max_workers
 
     def set_strategy(self, strategy: FeatureEngineeringStrategy):
         logging.info("Switching feature engineering strategy.")
@@ -102,13 +334,41 @@ class FeatureEngineer:
 
     def drop_noise_features(self, df: pd.DataFrame):
         logging.info("Dropping Noise Features...")
-        df = df.drop(columns=self.noise_features)
+        # noise features may already have been left out at ingestion
+        df = df.drop(columns=self.noise_features, errors="ignore")
         return df
 
+    def fit(self, df: pd.DataFrame):
+        logging.info("Fitting feature engineering strategy.")
+        if self.noise_features:
+            df = self.drop_noise_features(df)
+        if isinstance(self.strategy, CompositeFeatureEngineering):
+            self.strategy.fit(df, **self._executor_options())
+        else:
+            self.strategy.fit(df)
+        return self
+
+    def transform(self, df: pd.DataFrame):
+        logging.info("Applying fitted feature engineering strategy.")
+        if self.noise_features:
+            df = self.drop_noise_features(df)
+        return self.strategy.transform(df, **self._executor_options())
+
     def apply_feature_engineering(self, df: pd.DataFrame):
         logging.info("Applying feature engineering strategy.")
         if self.noise_features:
             df = self.drop_noise_features(df)
-        return self.strategy.apply_transformation(df)
+        return self.strategy.apply_transformation(df, **self._executor_options())
+
+    def _executor_options(self) -> dict:
+        parallel = isinstance(self.strategy, (ColumnwiseFeatureEngineeringStrategy, CompositeFeatureEngineering))
+        return {"max_workers": self.max_workers} if parallel and self.max_workers else {}
 
+    def save(self, path: str):
+        """Persists the fitted transform plan so serving can apply it without refitting"""
+        joblib.dump(self, path)
 
+    @staticmethod
+    def load(path: str) -> "FeatureEngineer":
+        """Loads a transform plan persisted with save"""
+        return joblib.load(path)
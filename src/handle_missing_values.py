@@ -1,4 +1,8 @@
+import json
+
+import numpy as np
 import pandas as pd
+from src.streaming_statistics import RunningMoments, ColumnQuantileSketch, ValueCounts
 
 from abc import ABC, abstractmethod
 import logging
@@ -6,6 +10,23 @@ import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
+def column_mode(series: pd.Series):
+    """
+    Most frequent value of a column in a single bincount pass over
+    its integer codes, the smallest value on ties as pandas does.
+    Categoricals reuse their codes, other columns are factorized.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, categories = pd.factorize(series, sort=True)
+
+    codes = codes[codes >= 0]
+    if len(codes) == 0:
+        return np.nan
+    return categories[np.bincount(codes, minlength=len(categories)).argmax()]
+
+
 class MissingValuesHandlingStrategy(ABC):
     """
     Abstract base class for handling missing values strategies
@@ -46,7 +67,9 @@ class DropMissingValuesStrategy(MissingValuesHandlingStrategy):
 class FillMissingValuesStrategy(MissingValuesHandlingStrategy):
     """
     Concrete implementation of MissingValuesHandlingStrategy
-    to fill missing values in the data
+    to fill missing values in the data. The fill values are
+    learned once with fit and reused by transform, so the
+    same statistics can be persisted and applied at inference
     """
 
     def __init__(self, method="mean", fill_value=None):
@@ -57,40 +80,154 @@ class FillMissingValuesStrategy(MissingValuesHandlingStrategy):
         """
         self.method = method
         self.fill_value = fill_value
+        self.fill_values = None
+        self.accumulator = None
 
-    def handle(self, df: pd.DataFrame):
+    def fit(self, df: pd.DataFrame):
         """
-        Fill in missing values in the data with
-        specified method or fill value
+        Computes the per-column fill values of the
+        specified method in one vectorized pass
         """
-        logging.info(f"Filling missing values using the method: {self.method}")
-
-        data = df.copy()
+        logging.info(f"Computing fill values using the method: {self.method}")
 
+        numeric_columns = df.select_dtypes(include="number").columns
         if self.method=="mean":
-            numeric_columns = data.select_dtypes(include="number").columns
-            data[numeric_columns] = data[numeric_columns].fillna(
-                data[numeric_columns].mean()
-            )
+            fill_values = df[numeric_columns].mean()
         elif self.method=="median":
-            numeric_columns = data.select_dtypes(include="number").columns
-            data[numeric_columns] = data[numeric_columns].fillna(
-                data[numeric_columns].median()
-            )
+            fill_values = df[numeric_columns].median()
         elif self.method=="mode":
-            numeric_columns = data.select_dtypes(include="number").columns
-            data[numeric_columns] = data[numeric_columns].fillna(
-                data[numeric_columns].mode()
-            )
+            mode_columns = df.select_dtypes(include=["number", "object", "category"]).columns
+            fill_values = pd.Series({column: column_mode(df[column]) for column in mode_columns}, dtype=object)
         elif self.method=="constant":
-            data = data.fillna(value=self.fill_value)
+            fill_values = pd.Series(self.fill_value, index=df.columns)
         else:
             logging.warning(f"Unknown method {self.method}. No missing values handled.")
-            return data
+            fill_values = pd.Series(dtype=object)
+
+        # columns without a single observed value have nothing to fill with
+        self.fill_values = {
+            column: value.item() if hasattr(value, "item") else value
+            for column, value in fill_values.dropna().items()
+        }
+        return self
+
+    def partial_fit(self, df: pd.DataFrame):
+        """
+        Updates the fill values with one batch of a dataset too
+        large for memory, using mergeable accumulators: running
+        moments for the mean, a quantile sketch for the median
+        and a count map for the mode
+        """
+        numeric_columns = df.select_dtypes(include="number").columns
+        if self.accumulator is None:
+            if self.method=="mean":
+                self.accumulator = RunningMoments()
+            elif self.method=="median":
+                self.accumulator = ColumnQuantileSketch()
+            elif self.method=="mode":
+                self.accumulator = ValueCounts()
+            elif self.method=="constant":
+                self.accumulator = set()
+            else:
+                logging.warning(f"Unknown method {self.method}. No missing values handled.")
+                self.accumulator = set()
+
+        if self.method in ["mean", "median"]:
+            self.accumulator.update(df[numeric_columns])
+        elif self.method=="mode":
+            self.accumulator.update(df.select_dtypes(include=["number", "object", "category"]))
+        elif self.method=="constant":
+            self.accumulator.update(df.columns)
+
+        self._finalize_accumulator()
+        return self
+
+    def merge(self, other: "FillMissingValuesStrategy"):
+        """
+        Merges the accumulators of a strategy partially fitted
+        on another partition or worker process into this one
+        """
+        if self.accumulator is None:
+            self.accumulator = other.accumulator
+        elif other.accumulator is not None:
+            if isinstance(self.accumulator, set):
+                self.accumulator |= other.accumulator
+            else:
+                self.accumulator.merge(other.accumulator)
+        self._finalize_accumulator()
+        return self
+
+    def _finalize_accumulator(self):
+        if self.method=="mean":
+            fill_values = self.accumulator.mean
+        elif self.method=="median":
+            fill_values = self.accumulator.quantile(0.5)
+        elif self.method=="mode":
+            fill_values = self.accumulator.mode()
+        elif self.method=="constant":
+            fill_values = pd.Series(self.fill_value, index=list(self.accumulator), dtype=object)
+        else:
+            fill_values = pd.Series(dtype=object)
+
+        self.fill_values = {
+            column: value.item() if hasattr(value, "item") else value
+            for column, value in fill_values.dropna().items()
+        }
+
+    def transform(self, df: pd.DataFrame):
+        """
+        Fill in missing values in the data with
+        the fill values computed by fit
+        """
+        if self.fill_values is None:
+            raise ValueError("FillMissingValuesStrategy must be fitted before transform.")
+
+        logging.info(f"Filling missing values using the method: {self.method}")
+        fill_values = {
+            column: value for column, value in self.fill_values.items() if column in df.columns
+        }
+        data = df.fillna(value=fill_values)
 
         logging.info("Missing Values filled.")
         return data
 
+    def handle(self, df: pd.DataFrame):
+        """
+        Fill in missing values in the data with
+        specified method or fill value
+        """
+        return self.fit(df).transform(df)
+
+    def to_dict(self) -> dict:
+        """
+        Serializable form of the fitted statistics
+        """
+        return {"method": self.method, "fill_value": self.fill_value, "fill_values": self.fill_values}
+
+    @classmethod
+    def from_dict(cls, params: dict):
+        """
+        Rebuilds a fitted strategy from the output of to_dict
+        """
+        strategy = cls(method=params["method"], fill_value=params["fill_value"])
+        strategy.fill_values = params["fill_values"]
+        return strategy
+
+    def save(self, path: str):
+        """
+        Persists the fitted statistics as a JSON artifact
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a fitted strategy persisted with save
+        """
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
 
 class MissingValuesHandler:
     """
@@ -1,10 +1,24 @@
+import hashlib
+import io
+import json
 import os
+import shutil
+import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+import numpy as np
 import pandas as pd
 
 from abc import ABC, abstractmethod
 from dotenv import load_dotenv
+import logging
+
 load_dotenv()
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
 
 class DataIngestor(ABC):
     """Abstract class for data ingestor"""
@@ -13,43 +27,628 @@ class DataIngestor(ABC):
         """Method to ingest data from provided file path"""
         pass
 
+    @abstractmethod
+    def ingest_chunks(self, file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Method to ingest data from provided file path in batches of chunksize rows"""
+        pass
+
+    def parse_options(self) -> dict:
+        """Options that affect the parsed frame, used to key cached results"""
+        return {}
+
+    def header(self, file_path: str) -> list:
+        """Column names in the source without parsing any rows, None if unknown"""
+        return None
+
+
+class IngestionSchema:
+    """
+    Compact column dtypes used at ingestion. Object columns are loaded as
+    categoricals over a fixed set of levels and numerics are downcast to
+    the smallest width that holds every observed value. The schema is
+    inferred once and persisted as JSON so every later read of the same
+    data version shares the same dtypes. Levels missing from the schema
+    are read as NaN, so re-infer it when the data version changes.
+    """
+
+    def __init__(self, dtypes: dict):
+        """
+        :param dtypes: column name -> numpy dtype name, "object",
+                       or {"categories": [...]} for categoricals
+        """
+        self.dtypes = dtypes
+
+    @classmethod
+    def infer(cls, chunks: Iterable[pd.DataFrame]) -> "IngestionSchema":
+        """Infers the schema batch by batch, a whole frame can be passed as [df]"""
+        stats = {}
+        for chunk in chunks:
+            for column in chunk.columns:
+                _update_column_stats(stats.setdefault(column, {}), chunk[column])
+        return cls({column: _compact_dtype(column_stats) for column, column_stats in stats.items()})
+
+    @classmethod
+    def load(cls, path: str) -> "IngestionSchema":
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.dtypes, file, indent=2, default=str)
+
+    def pandas_dtypes(self, columns: Iterable[str] = None) -> dict:
+        """Column to pandas dtype mapping, usable as read_csv's dtype argument"""
+        columns = self.dtypes.keys() if columns is None else columns
+        return {
+            column: pd.CategoricalDtype(self.dtypes[column]["categories"])
+            if isinstance(self.dtypes[column], dict) else self.dtypes[column]
+            for column in columns if column in self.dtypes
+        }
+
+    def delta_dtypes(self, columns: Iterable[str] = None) -> dict:
+        """
+        Dtypes for parsing data appended after the schema was inferred.
+        Categoricals take the levels found in the data, numerics are read
+        as float64 so wider values and missing ones still fit, so a delta
+        never loses values the schema has not seen
+        """
+        dtypes = {}
+        for column, dtype in self.pandas_dtypes(columns).items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                dtypes[column] = "category"
+            elif np.dtype(dtype).kind in "iuf":
+                dtypes[column] = "float64"
+        return dtypes
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Casts an already parsed frame to the schema dtypes"""
+        return df.astype(self.pandas_dtypes(df.columns))
+
+
+_KIND_ORDER = "bifO"
+_FLOAT32_EXACT_INT = 2 ** 24
+
+
+def _update_column_stats(stats: dict, series: pd.Series):
+    """Folds one batch of a column into the running statistics used by _compact_dtype"""
+    if series.isna().all():
+        # an all-missing batch is parsed as float whatever the column holds elsewhere
+        return
+    if pd.api.types.is_bool_dtype(series):
+        kind = "b"
+    elif pd.api.types.is_integer_dtype(series):
+        kind = "i"
+    elif pd.api.types.is_float_dtype(series):
+        kind = "f"
+    else:
+        kind = "O"
+
+    previous_kind = stats.get("kind", kind)
+    stats["kind"] = max(previous_kind, kind, key=_KIND_ORDER.index)
+    if kind != previous_kind and "O" in (kind, previous_kind):
+        # numeric and text batches of one column, the numeric values were never collected as levels
+        stats["mixed"] = True
+
+    if kind in "if":
+        values = series.dropna().to_numpy()
+        if len(values):
+            stats["min"] = min(stats.get("min", values.min()), values.min())
+            stats["max"] = max(stats.get("max", values.max()), values.max())
+        if kind == "f":
+            lossless = np.array_equal(values.astype(np.float32).astype(values.dtype), values)
+            stats["float32"] = stats.get("float32", True) and lossless
+        else:
+            stats["int_seen"] = True
+    elif kind == "O":
+        stats.setdefault("categories", set()).update(series.dropna().unique())
+
+
+def _compact_dtype(stats: dict):
+    """Smallest dtype that holds every value summarized in stats"""
+    kind = stats.get("kind", "f")
+    if kind == "b":
+        return "bool"
+    if kind == "i":
+        for dtype in ("int8", "int16", "int32"):
+            if np.iinfo(dtype).min <= stats["min"] and stats["max"] <= np.iinfo(dtype).max:
+                return dtype
+        return "int64"
+    if kind == "f":
+        ints_fit = not stats.get("int_seen") or (
+            "min" in stats and max(abs(stats["min"]), abs(stats["max"])) <= _FLOAT32_EXACT_INT
+        )
+        return "float32" if stats.get("float32", True) and ints_fit else "float64"
+    if stats.get("mixed"):
+        return "object"
+    return {"categories": sorted(stats.get("categories", ()), key=str)}
+
 
 class ZipDataIngestor(DataIngestor):
     """concrete class for ZIP ingestion"""
 
+    def __init__(self, stream: bool = True, schema_path: str = None,
+                 member: str = None, max_workers: int = None, columns: list = None):
+        """
+        Initializes the ingestor. With stream enabled the CSV members are
+        parsed straight out of the archive, otherwise the archive is
+        extracted to EXTRACTED_DIR first and the CSVs are read from disk.
+        With a schema path the data is loaded with the compact dtypes of
+        the persisted IngestionSchema, inferring and saving it on first use.
+        Archives holding several CSVs are ingested as a whole, parsing the
+        members concurrently on max_workers threads, unless a member is named.
+        When columns are given only those are parsed, the rest are skipped
+        by the CSV reader and never allocated.
+        """
+        self.stream = stream
+        self.schema_path = schema_path
+        self.member = member
+        self.max_workers = max_workers
+        self.columns = columns
+
+    def parse_options(self) -> dict:
+        schema = self.load_schema()
+        return {
+            "schema": schema.dtypes if schema else None,
+            "member": self.member,
+            "columns": sorted(self.columns) if self.columns is not None else None
+        }
+
+    def read_csv_options(self, schema: IngestionSchema = None, all_columns: bool = False) -> dict:
+        """Keyword arguments passed to pd.read_csv for every member"""
+        columns = None if all_columns else self.columns
+        return {
+            "usecols": columns,
+            "dtype": schema.pandas_dtypes(columns) if schema else None
+        }
+
+    def load_schema(self):
+        """Returns the persisted IngestionSchema, or None if there is none yet"""
+        if self.schema_path and os.path.exists(self.schema_path):
+            return IngestionSchema.load(self.schema_path)
+        return None
+
+    def infer_schema(self, file_path: str, chunksize: int = 100000) -> IngestionSchema:
+        """
+        Infers the schema over every column in a streaming pass and persists it.
+        A projected read never infers from its own columns only, since the
+        saved schema also serves later reads of the other columns.
+        """
+        logging.info(f"Inferring ingestion schema, saving it to {self.schema_path}")
+        schema = IngestionSchema.infer(self._read_chunks(file_path, chunksize, all_columns=True))
+        schema.save(self.schema_path)
+        return schema
+
     def ingest(self, file_path: str) -> pd.DataFrame:
+        schema = self.load_schema()
+        if self.schema_path and schema is None and self.columns is not None:
+            schema = self.infer_schema(file_path)
+        csv_files = self._csv_members(file_path)
+
+        if len(csv_files) == 1:
+            parts = [self._read_member(file_path, csv_files[0], schema)]
+        else:
+            # the C parser releases the GIL while tokenizing, so threads parse members in parallel
+            logging.info(f"Reading {len(csv_files)} CSV files concurrently.")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                parts = list(executor.map(
+                    lambda csv_file: self._read_member(file_path, csv_file, schema), csv_files
+                ))
+
+        if self.schema_path and schema is None:
+            logging.info(f"Inferring ingestion schema, saving it to {self.schema_path}")
+            schema = IngestionSchema.infer(parts)
+            schema.save(self.schema_path)
+            parts = [schema.apply(part) for part in parts]
+
+        if len(parts) == 1:
+            return parts[0]
+        # every member shares the schema dtypes, so categoricals survive the concat
+        return pd.concat(parts, ignore_index=True)
+
+    def ingest_chunks(self, file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        schema = self.load_schema()
+        if self.schema_path and schema is None:
+            # a first streaming pass infers the schema so every batch shares the same dtypes
+            schema = self.infer_schema(file_path, chunksize)
+        yield from self._read_chunks(file_path, chunksize, schema)
+
+    def _read_chunks(self, file_path: str, chunksize: int, schema: IngestionSchema = None,
+                     all_columns: bool = False):
+        read_options = self.read_csv_options(schema, all_columns)
+        n_rows = 0
+        for csv_file in self._csv_members(file_path):
+            with self._open_member(file_path, csv_file) as csv_source:
+                with pd.read_csv(csv_source, chunksize=chunksize, **read_options) as reader:
+                    for chunk in reader:
+                        # number rows continuously across members, as ingest does
+                        chunk.index = pd.RangeIndex(n_rows, n_rows + len(chunk))
+                        n_rows += len(chunk)
+                        yield chunk
+
+    def header(self, file_path: str) -> list:
+        columns = []
+        for csv_file in self._csv_members(file_path):
+            with self._open_member(file_path, csv_file) as csv_source:
+                columns += [column for column in pd.read_csv(csv_source, nrows=0).columns if column not in columns]
+        return columns
+
+    def _read_member(self, file_path: str, csv_file: str, schema: IngestionSchema = None) -> pd.DataFrame:
+        with self._open_member(file_path, csv_file) as csv_source:
+            return pd.read_csv(csv_source, **self.read_csv_options(schema))
+
+    def _csv_members(self, file_path: str) -> list:
+        """Lists the CSV members to ingest, extracting them first when not streaming"""
 
         # Checking for valid zip file
         if not file_path.endswith(".zip"):
             raise ValueError("The provided file path does not belong to a valid zip file.")
 
-        # extracting data from zip file
         with zipfile.ZipFile(file_path, 'r') as zip_reader:
-            zip_reader.extractall("extracted_data")
+            # get the csv members from the archive
+            csv_files = sorted(file for file in zip_reader.namelist() if file.endswith(".csv"))
 
-        # list the extracted file
-        extracted_files = os.listdir(os.getenv("EXTRACTED_DIR"))
-        # get the csv files from extracted folder
-        csv_files = [file for file in extracted_files if file.endswith(".csv")]
+            if self.member is not None:
+                if self.member not in csv_files:
+                    raise FileNotFoundError(f"CSV file {self.member} not found in the archive.")
+                csv_files = [self.member]
+            if len(csv_files) == 0:
+                raise FileNotFoundError("No CSV file found in extracted data.")
 
-        if len(csv_files) == 0:
-            raise FileNotFoundError("No CSV file found in extracted data.")
-        elif len(csv_files) > 1:
-            raise ValueError("More than one CSV files found. Specify the file to use.")
-        else:
+            if not self.stream:
+                # extracting data from zip file
+                zip_reader.extractall(os.getenv("EXTRACTED_DIR"), members=csv_files)
+
+        return csv_files
+
+    @contextmanager
+    def _open_member(self, file_path: str, csv_file: str):
+        """Yields a readable source for a CSV member, each call with its own archive handle"""
+        if not self.stream:
             # Reads in data from avb csv file
-            csv_file_data = os.path.join(os.getenv("EXTRACTED_DIR"), csv_files[0])
-            data = pd.read_csv(csv_file_data)
-            return data
+            yield os.path.join(os.getenv("EXTRACTED_DIR"), csv_file)
+            return
+
+        # parse the member directly from the archive, no temp files
+        with zipfile.ZipFile(file_path, 'r') as zip_reader:
+            with zip_reader.open(csv_file) as csv_stream:
+                yield csv_stream
+
+
+class CachedDataIngestor(DataIngestor):
+    """
+    Wraps another ingestor and keeps its parsed output in a columnar
+    cache keyed by the source file content hash and the parse options
+    """
+
+    def __init__(self, ingestor: DataIngestor, cache_dir: str):
+        self.ingestor = ingestor
+        self.cache_dir = cache_dir
+
+    def parse_options(self) -> dict:
+        return self.ingestor.parse_options()
+
+    def header(self, file_path: str) -> list:
+        return self.ingestor.header(file_path)
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """Hash of the file content"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def cache_key(self, file_path: str, file_hash: str = None) -> str:
+        """Hash of the file content plus the wrapped ingestor's parse options"""
+        digest = hashlib.sha256((file_hash or self.file_hash(file_path)).encode())
+        options = {"ingestor": type(self.ingestor).__name__, "options": self.parse_options()}
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def ingest(self, file_path: str) -> pd.DataFrame:
+        file_hash = self.file_hash(file_path)
+        entry_dir = os.path.join(self.cache_dir, self.cache_key(file_path, file_hash))
+
+        if os.path.isdir(entry_dir):
+            logging.info(f"Loading cached data from {entry_dir}")
+            return read_columnar(entry_dir)
+
+        data = self.ingestor.ingest(file_path)
+        # the ingestor may have inferred and persisted its schema, which is part of the key
+        entry_dir = os.path.join(self.cache_dir, self.cache_key(file_path, file_hash))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_columnar(data, entry_dir)
+        logging.info(f"Cached ingested data at {entry_dir}")
+        return data
+
+    def ingest_chunks(self, file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        entry_dir = os.path.join(self.cache_dir, self.cache_key(file_path))
+
+        if not os.path.isdir(entry_dir):
+            # a full frame is never materialized here, so the cache is left untouched
+            yield from self.ingestor.ingest_chunks(file_path, chunksize)
+            return
+
+        logging.info(f"Loading cached data from {entry_dir} in chunks of {chunksize} rows")
+        n_rows = columnar_length(entry_dir)
+        for start in range(0, n_rows, chunksize):
+            yield read_columnar(entry_dir, start, min(start + chunksize, n_rows))
+
+
+class IncrementalDataIngestor(DataIngestor):
+    """
+    Ingests a landing directory of .zip and .csv files incrementally.
+    A manifest in the state directory records which archives have been
+    ingested and, for each CSV file, the byte offset of the high-water
+    mark with the header names, so every run seeks straight to what
+    landed since the previous one. Each
+    delta is appended to a columnar history in the same directory.
+    Archives are treated as immutable, CSV files as append-only.
+    """
+
+    def __init__(self, state_dir: str = None, **ingestor_options):
+        """
+        :param state_dir: directory holding the manifest and the history,
+                          defaults to .ingestion_state inside the landing directory
+        :param ingestor_options: options of the ZipDataIngestor used for archives,
+                                 its schema and columns also apply to CSV files
+        """
+        self.state_dir = state_dir
+        self.zip_ingestor = ZipDataIngestor(**ingestor_options)
+
+    def parse_options(self) -> dict:
+        return self.zip_ingestor.parse_options()
+
+    def header(self, file_path: str) -> list:
+        columns = []
+        for file_name in sorted(os.listdir(file_path)):
+            landed_file = os.path.join(file_path, file_name)
+            if file_name.endswith(".zip"):
+                landed_columns = self.zip_ingestor.header(landed_file)
+            elif file_name.endswith(".csv") and os.path.getsize(landed_file):
+                landed_columns = pd.read_csv(landed_file, nrows=0).columns
+            else:
+                continue
+            columns += [column for column in landed_columns if column not in columns]
+        return columns
+
+    def ingest(self, file_path: str) -> pd.DataFrame:
+        """Ingests the new delta and returns it merged with the history"""
+        self.ingest_delta(file_path)
+        state_dir = self._state_dir(file_path)
+        parts = [read_columnar(os.path.join(state_dir, part)) for part in self._load_manifest(state_dir)["parts"]]
+        if len(parts) == 0:
+            return pd.DataFrame()
+        return concat_categorical(parts)
+
+    def ingest_chunks(self, file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Ingests the new delta and yields the merged history batch by batch"""
+        self.ingest_delta(file_path)
+        state_dir = self._state_dir(file_path)
+        n_rows = 0
+        for part in self._load_manifest(state_dir)["parts"]:
+            part_dir = os.path.join(state_dir, part)
+            part_rows = columnar_length(part_dir)
+            for start in range(0, part_rows, chunksize):
+                chunk = read_columnar(part_dir, start, min(start + chunksize, part_rows))
+                chunk.index = pd.RangeIndex(n_rows, n_rows + len(chunk))
+                n_rows += len(chunk)
+                yield chunk
+
+    def ingest_delta(self, file_path: str) -> pd.DataFrame:
+        """
+        Ingests only the files and rows that landed since the last run,
+        appends them to the history and returns them
+        """
+        state_dir = self._state_dir(file_path)
+        os.makedirs(state_dir, exist_ok=True)
+        manifest = self._load_manifest(state_dir)
+        schema = self.zip_ingestor.load_schema()
+        read_options = self.zip_ingestor.read_csv_options()
+        if schema is not None:
+            read_options["dtype"] = schema.delta_dtypes(self.zip_ingestor.columns)
+
+        deltas = []
+        for file_name in sorted(os.listdir(file_path)):
+            landed_file = os.path.join(file_path, file_name)
+            ingested = manifest["files"].get(file_name)
+            file_size = os.path.getsize(landed_file)
+
+            if file_name.endswith(".zip"):
+                if ingested is not None:
+                    continue
+                if schema is None:
+                    # the first archive is read as a whole, inferring the schema on it
+                    delta = self.zip_ingestor.ingest(landed_file)
+                else:
+                    delta = concat_categorical([
+                        self._read_zip_member(landed_file, csv_file, read_options)
+                        for csv_file in self.zip_ingestor._csv_members(landed_file)
+                    ])
+                ingested_rows = 0
+            elif file_name.endswith(".csv"):
+                if ingested is not None and ingested["size"] == file_size:
+                    continue
+                ingested_rows = ingested["rows"] if ingested else 0
+                delta, offset, header = self._read_csv_delta(landed_file, ingested, file_size, read_options)
+            else:
+                continue
+
+            logging.info(f"Ingested {len(delta)} new rows from {landed_file}")
+            manifest["files"][file_name] = {"rows": ingested_rows + len(delta), "size": file_size}
+            if file_name.endswith(".csv"):
+                manifest["files"][file_name].update({"offset": offset, "header": header})
+            if len(delta):
+                part = f"part-{len(manifest['parts']):06d}"
+                write_columnar(delta, os.path.join(state_dir, part))
+                manifest["parts"].append(part)
+                deltas.append(delta)
+
+        self._save_manifest(state_dir, manifest)
+
+        if len(deltas) == 0:
+            logging.info("No new data landed since the last run.")
+            return pd.DataFrame()
+        return concat_categorical(deltas)
+
+    def _read_zip_member(self, landed_file: str, csv_file: str, read_options: dict) -> pd.DataFrame:
+        with self.zip_ingestor._open_member(landed_file, csv_file) as csv_source:
+            return pd.read_csv(csv_source, **read_options)
+
+    @staticmethod
+    def _read_csv_delta(landed_file: str, ingested: dict, file_size: int, read_options: dict):
+        """
+        Parses the complete lines between the byte offset of the high-water
+        mark and the current end of an append-only CSV file
+
+        :return: the parsed rows, the new offset and the header names
+        """
+        offset = ingested["offset"] if ingested else 0
+        with open(landed_file, "rb") as file:
+            file.seek(offset)
+            data = file.read(file_size - offset)
+        # a line still being written is left for the next run
+        data = data[:data.rfind(b"\n") + 1]
+
+        if offset == 0:
+            if not data:
+                return pd.DataFrame(), 0, None
+            delta = pd.read_csv(io.BytesIO(data), **read_options)
+            header = pd.read_csv(io.BytesIO(data), nrows=0).columns.tolist()
+        else:
+            header = ingested["header"]
+            if not data:
+                return pd.DataFrame(), offset, header
+            delta = pd.read_csv(io.BytesIO(data), header=None, names=header, **read_options)
+
+        return delta, offset + len(data), header
+
+    def _state_dir(self, file_path: str) -> str:
+        return self.state_dir or os.path.join(file_path, ".ingestion_state")
+
+    @staticmethod
+    def _load_manifest(state_dir: str) -> dict:
+        manifest_path = os.path.join(state_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return {"files": {}, "parts": []}
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def _save_manifest(state_dir: str, manifest: dict):
+        # replace atomically so an interrupted run never leaves a truncated manifest
+        manifest_path = os.path.join(state_dir, "manifest.json")
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def concat_categorical(parts: list) -> pd.DataFrame:
+    """
+    Concatenates frames whose categorical columns hold different levels,
+    e.g. history parts of successive deltas, recasting each column to the
+    union of its levels first so it stays categorical
+    """
+    dtypes = {}
+    for column in parts[0].columns:
+        column_dtypes = [part[column].dtype for part in parts if column in part.columns]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in column_dtypes):
+            categories = column_dtypes[0].categories
+            for dtype in column_dtypes[1:]:
+                categories = categories.union(dtype.categories, sort=False)
+            dtypes[column] = pd.CategoricalDtype(categories)
+
+    parts = [part.astype({column: dtype for column, dtype in dtypes.items() if column in part.columns})
+             for part in parts]
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_columnar(df: pd.DataFrame, directory: str):
+    """
+    Writes the frame as one .npy file per column plus a metadata file.
+    Object and category columns are stored as integer codes with their
+    categories kept in the metadata. The directory is written atomically.
+    """
+    parent_dir = os.path.dirname(os.path.abspath(directory))
+    staging_dir = tempfile.mkdtemp(dir=parent_dir)
+
+    columns = []
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        entry = {"name": column, "file": f"{position}.npy"}
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+            entry["kind"] = "numeric"
+            values = series.to_numpy()
+        else:
+            entry["kind"] = "category" if isinstance(series.dtype, pd.CategoricalDtype) else "object"
+            categorical = series.astype("category")
+            entry["categories"] = categorical.cat.categories.tolist()
+            entry["ordered"] = bool(categorical.cat.ordered)
+            values = categorical.cat.codes.to_numpy()
+        np.save(os.path.join(staging_dir, entry["file"]), values)
+        columns.append(entry)
+
+    with open(os.path.join(staging_dir, "metadata.json"), "w") as file:
+        json.dump({"rows": len(df), "columns": columns}, file, default=str)
+
+    try:
+        os.rename(staging_dir, directory)
+    except OSError:
+        # another run has already populated the same entry
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def columnar_length(directory: str) -> int:
+    """Number of rows in a frame written by write_columnar"""
+    with open(os.path.join(directory, "metadata.json")) as file:
+        return json.load(file)["rows"]
+
+
+def read_columnar(directory: str, start: int = 0, stop: int = None) -> pd.DataFrame:
+    """
+    Reads the rows [start, stop) of a frame written by write_columnar,
+    memory-mapping every column so only the requested rows are decoded
+    """
+    with open(os.path.join(directory, "metadata.json")) as file:
+        metadata = json.load(file)
+
+    stop = metadata["rows"] if stop is None else stop
+    columns = {}
+    for entry in metadata["columns"]:
+        # copy-on-write mapping keeps the columns writable without touching the cache
+        values = np.load(os.path.join(directory, entry["file"]), mmap_mode="c").view(np.ndarray)
+        values = values[start:stop]
+        if entry["kind"] == "numeric":
+            columns[entry["name"]] = values
+            continue
+        categorical = pd.Categorical.from_codes(
+            values, categories=entry["categories"], ordered=entry["ordered"]
+        )
+        columns[entry["name"]] = categorical if entry["kind"] == "category" else np.asarray(categorical, dtype=object)
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(start, stop), copy=False)
 
 
 class DataIngestorFactory:
     @staticmethod
-    def get_data_ingestor(file_extension: str) -> DataIngestor:
-        """Provide appropriate data ingestor based on provided file extension"""
+    def get_data_ingestor(file_extension: str, cache_dir: str = None, **ingestor_options) -> DataIngestor:
+        """
+        Provide appropriate data ingestor based on provided file extension,
+        wrapped in a columnar cache when a cache directory is given.
+        Remaining options are passed on to the ingestor.
+        """
         if file_extension == ".zip":
-            return ZipDataIngestor()
-        raise ValueError(f"No ingestor available for {file_extension} file extension.")
+            ingestor = ZipDataIngestor(**ingestor_options)
+        elif file_extension == "":
+            # a landing directory, the incremental ingestor keeps its own columnar history
+            return IncrementalDataIngestor(**ingestor_options)
+        else:
+            raise ValueError(f"No ingestor available for {file_extension} file extension.")
+
+        if cache_dir:
+            return CachedDataIngestor(ingestor, cache_dir)
+        return ingestor
 
 
 # if __name__ == "__main__":
@@ -19,6 +19,23 @@ class ModelBuildingStrategy(ABC):
     """
     Abstract base class for Model building strategy.
     """
+    def __init__(self, **params: Any):
+        """
+        Initialized the strategy with hyperparameters of its pipeline.
+
+        :param params: pipeline parameters, e.g. model__max_depth=5
+        """
+        self.params = params
+
+    @abstractmethod
+    def make_estimator(self) -> Pipeline:
+        """
+        Abstract method to build the untrained pipeline with the strategy hyperparameters.
+
+        :return: unfitted scikit-learn pipeline.
+        """
+        pass
+
     @abstractmethod
     def build_and_train_model(self, X_train: pd.DataFrame, y_train: pd.Series) -> RegressorMixin:
         """
@@ -38,6 +55,19 @@ class LinearRegressionStrategy(ModelBuildingStrategy):
     using scikit Linear regression.
     """
 
+    def make_estimator(self) -> Pipeline:
+        """
+        Builds the untrained Linear Regression pipeline with scaling.
+
+        :return: unfitted scikit-learn pipeline.
+        """
+        return Pipeline(
+            [
+                ("scaler", StandardScaler()),
+                ("model", LinearRegression())
+            ]
+        ).set_params(**self.params)
+
     def build_and_train_model(self, X_train: pd.DataFrame, y_train: pd.Series) -> Pipeline:
         """
         Builds and train Linear Regression Model using scikit-learn.
@@ -50,17 +80,12 @@ class LinearRegressionStrategy(ModelBuildingStrategy):
 
         if not isinstance(X_train, pd.DataFrame):
             raise TypeError("X_train must be a pandas DataFrame.")
-        if not isinstance(y_train, pd.DataFrame):
+        if not isinstance(y_train, pd.Series):
             raise TypeError("y_train must be a pandas Series.")
 
         logging.info("Initializing the Linear Regression Model with scaling.")
 
-        pipeline = Pipeline(
-            [
-                ("scaler", StandardScaler()),
-                ("model", LinearRegression())
-            ]
-        )
+        pipeline = self.make_estimator()
 
         logging.info("Training Linear Regression Model.")
         pipeline.fit(X_train, y_train)
@@ -77,6 +102,19 @@ class DecisionTreeRegressionStrategy(ModelBuildingStrategy):
     using scikit Linear regression.
     """
 
+    def make_estimator(self) -> Pipeline:
+        """
+        Builds the untrained Decision Tree pipeline with scaling.
+
+        :return: unfitted scikit-learn pipeline.
+        """
+        return Pipeline(
+            [
+                ("scaler", StandardScaler()),
+                ("model", DecisionTreeRegressor())
+            ]
+        ).set_params(**self.params)
+
     def build_and_train_model(self, X_train: pd.DataFrame, y_train: pd.Series) -> Pipeline:
         """
         Builds and train Linear Regression Model using scikit-learn.
@@ -89,17 +127,12 @@ class DecisionTreeRegressionStrategy(ModelBuildingStrategy):
 
         if not isinstance(X_train, pd.DataFrame):
             raise TypeError("X_train must be a pandas DataFrame.")
-        if not isinstance(y_train, pd.DataFrame):
+        if not isinstance(y_train, pd.Series):
             raise TypeError("y_train must be a pandas Series.")
 
         logging.info("Initializing the Linear Regression Model with scaling.")
 
-        pipeline = Pipeline(
-            [
-                ("scaler", StandardScaler()),
-                ("model", DecisionTreeRegressor())
-            ]
-        )
+        pipeline = self.make_estimator()
 
         logging.info("Training Linear Regression Model.")
         pipeline.fit(X_train, y_train)
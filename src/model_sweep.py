@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.model_selection import ParameterGrid
+
+from src.model_building import ModelBuildingStrategy
+from src.model_evaluator import ModelEvaluator, RegressionModelEvaluationStrategy
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+# train and test matrices memory-mapped by every process pool worker, set by the initializer
+_SWEEP_DATA = {}
+
+
+def _init_sweep_worker(data_path: str):
+    # the arrays are mapped read-only from the page cache instead of being copied per worker
+    _SWEEP_DATA["X_train"], _SWEEP_DATA["y_train"], _SWEEP_DATA["X_test"], _SWEEP_DATA["y_test"] = (
+        joblib.load(data_path, mmap_mode="r")
+    )
+
+
+def _train_configuration(configuration: int, strategy: ModelBuildingStrategy) -> dict:
+    start = time.perf_counter()
+    model = strategy.make_estimator()
+    if sp.issparse(_SWEEP_DATA["X_train"]) and "scaler" in model.named_steps:
+        # centering would densify a sparse matrix
+        model.set_params(scaler__with_mean=False)
+    model.fit(_SWEEP_DATA["X_train"], _SWEEP_DATA["y_train"])
+    fit_time = time.perf_counter() - start
+
+    metrics = ModelEvaluator(strategy=RegressionModelEvaluationStrategy()).evaluate(
+        model, _SWEEP_DATA["X_test"], _SWEEP_DATA["y_test"]
+    )
+    return {"configuration": configuration, "strategy": type(strategy).__name__,
+            "params": strategy.params, **metrics, "fit_time": fit_time}
+
+
+def parameter_grid(strategy_class: type, grid: dict) -> list:
+    """
+    One strategy for every combination of the hyperparameter grid
+
+    :param strategy_class: ModelBuildingStrategy subclass
+    :param grid: lists of values by pipeline parameter, e.g. {"model__max_depth": [3, 5]}
+    :return: list of strategies
+    """
+    return [strategy_class(**params) for params in ParameterGrid(grid)]
+
+
+def run_sweep(strategies: list, X_train, y_train, X_test, y_test, max_workers: int = None,
+              work_dir: str = None) -> pd.DataFrame:
+    """
+    Trains and evaluates every strategy concurrently in a process pool.
+    The already transformed matrices are dumped once and memory-mapped
+    by the workers, so they are not pickled with every task.
+
+    :param strategies: configured ModelBuildingStrategy instances
+    :param X_train: transformed train matrix, dense or sparse
+    :param y_train: train target
+    :param X_test: transformed test matrix
+    :param y_test: test target
+    :param max_workers: size of the process pool
+    :param work_dir: directory of the shared data file, a temporary directory by default
+    :return: leaderboard of the configurations ranked by R-squared
+    """
+    logging.info(f"Sweeping {len(strategies)} model configurations.")
+    with tempfile.TemporaryDirectory(dir=work_dir) as shared_dir:
+        data_path = os.path.join(shared_dir, "sweep_data.joblib")
+        joblib.dump((X_train, y_train.to_numpy(), X_test, y_test.to_numpy()), data_path)
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                                 initargs=(data_path,)) as executor:
+            results = list(executor.map(_train_configuration, range(len(strategies)), strategies))
+
+    leaderboard = pd.DataFrame(results).sort_values("R-squared", ascending=False, ignore_index=True)
+    leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+    logging.info("Model sweep completed.")
+    return leaderboard
@@ -1,73 +1,502 @@
+import json
+import os
+import re
+
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from sklearn.ensemble import IsolationForest
+
+from src.streaming_statistics import ColumnQuantileSketch
 
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
+def outlier_row_mask(values: np.ndarray, lower: np.ndarray, upper: np.ndarray, block_rows: int = 65536):
+    """
+    Computes which rows have every value within [lower, upper] in one
+    pass over a 2D float array, block of rows by block of rows, so the
+    only temporaries are two boolean blocks whatever the number of rows.
+    Missing values never count as outliers.
+
+    :param values: array of shape (n_rows, n_columns)
+    :param lower: per-column lower bounds
+    :param upper: per-column upper bounds
+    :param block_rows: rows per block, rounded to a multiple of 8
+    :return: bit-packed keep mask (np.packbits layout, one bit per row)
+             and the number of outliers in each column
+    """
+    n_rows, n_columns = values.shape
+    block_rows = max(8, block_rows - block_rows % 8)
+
+    packed_mask = np.empty((n_rows + 7) // 8, dtype=np.uint8)
+    counts = np.zeros(n_columns, dtype=np.int64)
+    below = np.empty((min(block_rows, n_rows), n_columns), dtype=bool)
+    above = np.empty_like(below)
+
+    for start in range(0, n_rows, block_rows):
+        block = values[start:start + block_rows]
+        block_below, block_above = below[:len(block)], above[:len(block)]
+        np.less(block, lower, out=block_below)
+        np.greater(block, upper, out=block_above)
+        np.logical_or(block_below, block_above, out=block_below)
+
+        counts += block_below.sum(axis=0)
+        # blocks start on a byte boundary, so each one packs into its own bytes
+        packed_mask[start // 8:(start + len(block) + 7) // 8] = np.packbits(~block_below.any(axis=1))
+
+    return packed_mask, counts
+
+
+def box_plot_summary(values: np.ndarray, label: str, max_fliers: int = 1000, seed: int = 0) -> dict:
+    """
+    Summary statistics of a box plot in the format of matplotlib's bxp:
+    quartiles, whiskers at the furthest values within 1.5 IQR of the box
+    (as seaborn draws them) and a random subsample of the fliers, so the
+    plot does not depend on the number of rows
+    """
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"label": label, "med": np.nan, "q1": np.nan, "q3": np.nan,
+                "whislo": np.nan, "whishi": np.nan, "fliers": np.empty(0)}
+
+    q1, med, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    fliers = values[~inside]
+    if len(fliers) > max_fliers:
+        fliers = np.random.default_rng(seed).choice(fliers, max_fliers, replace=False)
+
+    return {"label": label, "med": med, "q1": q1, "q3": q3,
+            "whislo": values[inside].min(), "whishi": values[inside].max(), "fliers": fliers}
+
+
+def _render_box_plot(stats: dict, path: str) -> str:
+    # a bare Figure renders with the Agg canvas, no pyplot state or display involved
+    figure = Figure(figsize=(10, 6))
+    ax = figure.add_subplot()
+    ax.bxp([stats], vert=False, showfliers=True)
+    ax.set_yticks([])
+    ax.set_xlabel(stats["label"])
+    ax.set_title(f"Box plot of {stats['label']}")
+    figure.savefig(path)
+    return path
+
+
+def render_outlier_plots(df: pd.DataFrame, features: list, output_dir: str, fmt: str = "png",
+                         max_workers: int = None) -> list:
+    """
+    Renders the box plot of every feature to a file without any display.
+    The summaries are computed up front, so only a few numbers per feature
+    are shipped to the process pool drawing the figures.
+
+    :param df: dataframe holding the features
+    :param features: numeric features to plot
+    :param output_dir: directory the plots are written to
+    :param fmt: image format, e.g. "png" or "svg"
+    :param max_workers: size of the rendering process pool
+    :return: paths of the written plots, in the order of features
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = [
+        box_plot_summary(df[feature].to_numpy(dtype=np.float64, na_value=np.nan), feature)
+        for feature in features
+    ]
+    paths = [
+        os.path.join(output_dir, f"boxplot_{re.sub(r'[^0-9A-Za-z]+', '_', feature)}.{fmt}")
+        for feature in features
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_box_plot, summaries, paths))
+
+
 class OutlierDetectionStrategy(ABC):
     @abstractmethod
     def detect_outliers(self, df: pd.DataFrame):
         pass
 
 
-class ZScoreOutlierDetection(OutlierDetectionStrategy):
+class UnivariateOutlierDetectionStrategy(OutlierDetectionStrategy):
+    """
+    Strategy flagging the values outside per-column bounds
+    """
+
+    @abstractmethod
+    def compute_bounds(self, df: pd.DataFrame):
+        """Returns the lower and upper bound of every column as two series"""
+        pass
+
+    def detect_outliers(self, df: pd.DataFrame):
+        lower, upper = self.compute_bounds(df)
+        return (df < lower) | (df > upper)
+
+
+class ZScoreOutlierDetection(UnivariateOutlierDetectionStrategy):
     def __init__(self, threshold=3):
         self.threshold=threshold
 
+    def compute_bounds(self, df: pd.DataFrame):
+        # |x - mean| / std > threshold, solved for x
+        mean, std = df.mean(), df.std()
+        return mean - self.threshold*std, mean + self.threshold*std
+
     def detect_outliers(self, df: pd.DataFrame):
         logging.info("Detecting outliers with z-score method.")
-        z_scores = np.abs((df - df.mean())/df.std())
-        outliers = z_scores > self.threshold
+        outliers = super().detect_outliers(df)
         logging.info(f"Outliers detected with z-score threshold: {self.threshold}")
         return outliers
 
 
-class IQROutlierDetection(OutlierDetectionStrategy):
+def sketched_quantiles(sketch: ColumnQuantileSketch, df: pd.DataFrame, levels: list, k: int = 200) -> list:
+    """
+    Quantiles of every column of df estimated with a KLL sketch. A sketch
+    fed explicitly (e.g. over chunks or workers) is used as is, otherwise
+    a fresh one is built from df in a single pass and not kept.
+
+    :param sketch: fed sketch, or None to sketch df
+    :param levels: quantile levels, e.g. [0.25, 0.75]
+    :param k: accuracy parameter of a fresh sketch
+    :return: one series of per-column quantiles per level
+    """
+    if sketch is None:
+        sketch = ColumnQuantileSketch(k=k).update(df)
+    return [sketch.quantile(level).reindex(df.columns) for level in levels]
+
+
+class IQROutlierDetection(UnivariateOutlierDetectionStrategy):
+    def __init__(self, approximate: bool = False, sketch_size: int = 200):
+        """
+        :param approximate: estimate the quartiles with a mergeable KLL sketch
+                            instead of sorting every column
+        :param sketch_size: accuracy parameter k of the sketch
+        """
+        self.approximate = approximate
+        self.sketch_size = sketch_size
+        # fed by update and used for every frame until reset, each frame is sketched on its own otherwise
+        self.sketch = None
+
+    def update(self, df: pd.DataFrame):
+        """Feeds one chunk of data to the quartile sketch, exact quartiles need no state"""
+        if self.approximate:
+            if self.sketch is None:
+                self.sketch = ColumnQuantileSketch(k=self.sketch_size)
+            self.sketch.update(df)
+        return self
+
+    def merge(self, other: "IQROutlierDetection"):
+        """Merges the quartile sketch built by another worker"""
+        if self.approximate and other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = ColumnQuantileSketch(k=self.sketch_size)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def reset(self):
+        """Discards the fed sketch"""
+        self.sketch = None
+        return self
+
+    def compute_bounds(self, df: pd.DataFrame):
+        if self.approximate:
+            Q1, Q3 = sketched_quantiles(self.sketch, df, [0.25, 0.75], k=self.sketch_size)
+        else:
+            Q1 = df.quantile(0.25)
+            Q3 = df.quantile(0.75)
+        IQR = Q3-Q1
+        return Q1 - 1.5*IQR, Q3 + 1.5*IQR
+
     def detect_outliers(self, df: pd.DataFrame):
         logging.info("Detecting outliers using IQR method.")
-        Q1 = df.quantile(0.25)
-        Q3 = df.quantile(0.75)
-        IQR = Q3-Q1
-        outliers = (df < (Q1 - 1.5*IQR)) | (df > (Q3 + 1.5*IQR))
+        outliers = super().detect_outliers(df)
         logging.info(f"Outliers detected using the IQR method.")
         return outliers
 
 
+# model scored by the process pool workers, set once per worker by the initializer
+_SCORING_MODEL = None
+
+
+def _init_scoring_worker(model):
+    global _SCORING_MODEL
+    _SCORING_MODEL = model
+
+
+def _score_rows(values: np.ndarray) -> np.ndarray:
+    return _SCORING_MODEL.predict(values) == -1
+
+
+class IsolationForestOutlierDetection(OutlierDetectionStrategy):
+    """
+    Multivariate strategy flagging whole rows whose combination of values
+    is unusual, e.g. a huge living area on a tiny lot, even when every
+    value is plausible on its own. The forest is trained on a bounded
+    subsample and the rows are scored in chunks across a process pool.
+    """
+
+    def __init__(self, n_estimators: int = 100, max_train_rows: int = 10000, contamination="auto",
+                 chunk_rows: int = 50000, max_workers: int = None, random_state: int = 42):
+        """
+        :param n_estimators: number of isolation trees
+        :param max_train_rows: size of the subsample the forest is trained on
+        :param contamination: expected share of outliers, "auto" uses the original paper threshold
+        :param chunk_rows: rows scored per worker task, smaller frames are scored in process
+        :param max_workers: size of the scoring process pool
+        :param random_state: seed of the subsample and of the forest
+        """
+        self.n_estimators = n_estimators
+        self.max_train_rows = max_train_rows
+        self.contamination = contamination
+        self.chunk_rows = chunk_rows
+        self.max_workers = max_workers
+        self.random_state = random_state
+        self.model = None
+        self.fill_values = None
+
+    def fit(self, df: pd.DataFrame):
+        """
+        Trains the forest on a random subsample of at most max_train_rows rows
+        """
+        sample = df.sample(n=min(self.max_train_rows, len(df)), random_state=self.random_state)
+        # the trees cannot split on missing values, they are imputed with the sample medians
+        self.fill_values = sample.median()
+        self.model = IsolationForest(
+            n_estimators=self.n_estimators, contamination=self.contamination, random_state=self.random_state
+        )
+        self.model.fit(sample.fillna(self.fill_values).to_numpy(dtype=np.float64))
+        return self
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Boolean array flagging the outlier rows of df
+        """
+        values = df.fillna(self.fill_values).to_numpy(dtype=np.float64)
+        if len(values) <= self.chunk_rows:
+            return self.model.predict(values) == -1
+
+        chunks = [values[start:start + self.chunk_rows] for start in range(0, len(values), self.chunk_rows)]
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_scoring_worker,
+                                 initargs=(self.model,)) as executor:
+            return np.concatenate(list(executor.map(_score_rows, chunks)))
+
+    def detect_outliers(self, df: pd.DataFrame):
+        logging.info("Detecting outliers with isolation forest method.")
+        if self.model is None:
+            self.fit(df)
+        outliers = pd.DataFrame({"multivariate_outlier": self.score(df)}, index=df.index)
+        logging.info(f"Outliers detected with isolation forest: {int(outliers.values.sum())} rows.")
+        return outliers
+
+
 class OutlierDetector:
-    def __init__(self, strategy: OutlierDetectionStrategy):
+    def __init__(self, strategy: OutlierDetectionStrategy, approximate_quantiles: bool = False):
+        """
+        :param approximate_quantiles: estimate the capping quantiles with a
+                                      mergeable KLL sketch instead of sorting
+        """
         self.strategy = strategy
+        self.approximate_quantiles = approximate_quantiles
+        # fed by update and used for every frame until reset, each frame is sketched on its own otherwise
+        self.quantile_sketch = None
+        # per-column lower, upper, cap_lower and cap_upper, set by fit
+        self.bounds = None
 
     def set_strategy(self, strategy: OutlierDetectionStrategy):
         logging.info("Switching outlier detection strategy.")
         self.strategy = strategy
 
+    def update(self, df: pd.DataFrame):
+        """
+        Feeds one chunk of streaming data to the quantile sketches
+        of the detector and of its strategy
+        """
+        if self.approximate_quantiles:
+            if self.quantile_sketch is None:
+                self.quantile_sketch = ColumnQuantileSketch()
+            self.quantile_sketch.update(df)
+        if hasattr(self.strategy, "update"):
+            self.strategy.update(df)
+        return self
+
+    def merge(self, other: "OutlierDetector"):
+        """
+        Merges the sketches built by another worker on its partition
+        """
+        if self.approximate_quantiles and other.quantile_sketch is not None:
+            if self.quantile_sketch is None:
+                self.quantile_sketch = ColumnQuantileSketch()
+            self.quantile_sketch.merge(other.quantile_sketch)
+        if hasattr(self.strategy, "merge"):
+            self.strategy.merge(other.strategy)
+        return self
+
+    def reset(self):
+        """
+        Discards the sketches fed by update, later frames are sketched on their own
+        """
+        self.quantile_sketch = None
+        if hasattr(self.strategy, "reset"):
+            self.strategy.reset()
+        return self
+
     def detect_outliers(self, df: pd.DataFrame):
         logging.info("Executing the detect outliers strategy.")
         return self.strategy.detect_outliers(df)
 
+    def outlier_row_mask(self, df: pd.DataFrame):
+        """
+        Bit-packed mask of the rows without outliers and the outlier count
+        of every column, computed without any intermediate frame
+
+        :return: packed keep mask (unpack with np.unpackbits(mask, count=len(df)))
+                 and a series of outlier counts per column
+        """
+        logging.info("Computing the outlier row mask.")
+        lower, upper = self.strategy.compute_bounds(df)
+        packed_mask, counts = outlier_row_mask(
+            df.to_numpy(dtype=np.float64, na_value=np.nan),
+            lower.to_numpy(dtype=np.float64), upper.to_numpy(dtype=np.float64)
+        )
+        return packed_mask, pd.Series(counts, index=df.columns)
+
     def handle_outliers(self, df: pd.DataFrame, method: str = "remove"):
-        outliers = self.detect_outliers(df)
         if method == "remove":
             logging.info("Removing the outliers from the dataset.")
-            df_cleaned = df[(~outliers).all(axis=1)]
+            if isinstance(self.strategy, UnivariateOutlierDetectionStrategy):
+                packed_mask, counts = self.outlier_row_mask(df)
+                logging.info(f"Outliers per column: {counts[counts > 0].to_dict()}")
+                keep = np.unpackbits(packed_mask, count=len(df)).view(bool)
+                df_cleaned = df[keep]
+            else:
+                outliers = self.detect_outliers(df)
+                df_cleaned = df[(~outliers).all(axis=1)]
         elif method == "cap":
             logging.info("Capping the outliers from the dataset.")
-            df_cleaned = df.clip(lower=df.quantile(0.01), upper=df.quantile(0.99), axis=1)
+            if self.approximate_quantiles:
+                lower, upper = sketched_quantiles(self.quantile_sketch, df, [0.01, 0.99])
+            else:
+                lower, upper = df.quantile(0.01), df.quantile(0.99)
+            df_cleaned = df.clip(lower=lower, upper=upper, axis=1)
         else:
             logging.info(f"Unknown method: {self.strategy}. Outliers are not handled.")
+            df_cleaned = df
         logging.info("Outliers handling completed.")
 
         return df_cleaned
 
-    def visualize_outliers(self, df: pd.DataFrame, features: list):
+    def fit(self, df: pd.DataFrame):
+        """
+        Learns the per-column detection bounds of the strategy and the
+        1%/99% capping bounds, so they can be applied to unseen data
+
+        :param df: numeric training data
+        """
+        if not isinstance(self.strategy, UnivariateOutlierDetectionStrategy):
+            raise ValueError(f"Cannot fit per-column bounds with {type(self.strategy).__name__}.")
+
+        logging.info("Fitting the outlier bounds.")
+        lower, upper = self.strategy.compute_bounds(df)
+        if self.approximate_quantiles:
+            cap_lower, cap_upper = sketched_quantiles(self.quantile_sketch, df, [0.01, 0.99])
+        else:
+            cap_lower, cap_upper = df.quantile(0.01), df.quantile(0.99)
+
+        self.bounds = pd.DataFrame(
+            {"lower": lower, "upper": upper, "cap_lower": cap_lower, "cap_upper": cap_upper},
+            index=df.columns, dtype="float64"
+        )
+        return self
+
+    def apply(self, df: pd.DataFrame, action: str = "clip"):
+        """
+        Applies the fitted bounds to new data with one vectorized comparison.
+        Columns without fitted bounds are left untouched.
+
+        :param df: data to guard, e.g. an inference batch
+        :param action: "clip" caps the values to the fitted 1%/99% bounds,
+                       "flag" marks the rows with any value outside the detection bounds
+        :return: clipped dataframe, or boolean series of flagged rows
+        """
+        if self.bounds is None:
+            raise ValueError("OutlierDetector is not fitted, call fit first.")
+
+        columns = [column for column in df.columns if column in self.bounds.index]
+        bounds = self.bounds.loc[columns]
+        values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        if action == "clip":
+            # a missing bound does not constrain its column
+            lower = bounds["cap_lower"].fillna(-np.inf).to_numpy()
+            upper = bounds["cap_upper"].fillna(np.inf).to_numpy()
+            clipped = np.clip(values, lower, upper)
+            return df.assign(**{column: clipped[:, i] for i, column in enumerate(columns)})
+        elif action == "flag":
+            packed_mask, counts = outlier_row_mask(
+                values, bounds["lower"].to_numpy(), bounds["upper"].to_numpy()
+            )
+            keep = np.unpackbits(packed_mask, count=len(df)).view(bool)
+            return pd.Series(~keep, index=df.index, name="is_outlier")
+        else:
+            raise ValueError(f"Unsupported outlier action: {action}")
+
+    def to_dict(self) -> dict:
+        """
+        Serializable form of the fitted bounds
+        """
+        bounds = self.bounds.astype(object).where(self.bounds.notna(), None)
+        return {"strategy": type(self.strategy).__name__, "bounds": bounds.to_dict(orient="index")}
+
+    @classmethod
+    def from_dict(cls, params: dict):
+        """
+        Rebuilds a fitted detector from the output of to_dict
+        """
+        detector = cls(OUTLIER_DETECTION_STRATEGIES[params["strategy"]]())
+        detector.bounds = pd.DataFrame.from_dict(params["bounds"], orient="index", dtype="float64")
+        return detector
+
+    def save(self, path: str):
+        """
+        Persists the fitted bounds as a JSON artifact
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a fitted detector persisted with save
+        """
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def visualize_outliers(self, df: pd.DataFrame, features: list, output_dir: str = None, fmt: str = "png",
+                           max_workers: int = None):
+        """
+        Shows the box plot of every feature, or writes them all to
+        output_dir in parallel when running headless
+
+        :return: paths of the written plots when output_dir is set
+        """
         logging.info(f"Visualize outliers for features: {features}.")
+        if output_dir is not None:
+            paths = render_outlier_plots(df, features, output_dir, fmt=fmt, max_workers=max_workers)
+            logging.info(f"Box plots written to {output_dir}.")
+            return paths
         for feature in features:
             plt.figure(figsize=(10,6))
             sns.boxplot(x=feature, data=df)
             plt.title(f"Box plot of {feature}")
             plt.show()
 
+
+# strategies a detector can be rebuilt with from its persisted bounds
+OUTLIER_DETECTION_STRATEGIES = {
+    "ZScoreOutlierDetection": ZScoreOutlierDetection,
+    "IQROutlierDetection": IQROutlierDetection,
+}
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class RunningMoments:
+    """
+    Per-column count, mean and variance accumulated batch by batch
+    with Welford's update, merged across batches and workers with
+    Chan's parallel formula
+    """
+
+    def __init__(self):
+        """
+        Initializes empty accumulators
+        """
+        self.count = pd.Series(dtype="float64")
+        self._mean = pd.Series(dtype="float64")
+        self._m2 = pd.Series(dtype="float64")
+
+    def update(self, df: pd.DataFrame):
+        """
+        Folds a batch of numeric columns into the accumulators
+        """
+        values = df.astype("float64")
+        batch_count = values.count().astype("float64")
+        batch_mean = values.mean().fillna(0.0)
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        self._combine(batch_count, batch_mean, batch_m2)
+        return self
+
+    def merge(self, other: "RunningMoments"):
+        """
+        Merges the accumulators of another worker into this one
+        """
+        self._combine(other.count, other._mean, other._m2)
+        return self
+
+    def _combine(self, batch_count: pd.Series, batch_mean: pd.Series, batch_m2: pd.Series):
+        columns = self.count.index.union(batch_count.index, sort=False)
+        count_a, mean_a, m2_a = (
+            series.reindex(columns, fill_value=0.0) for series in (self.count, self._mean, self._m2)
+        )
+        count_b, mean_b, m2_b = (
+            series.reindex(columns, fill_value=0.0) for series in (batch_count, batch_mean, batch_m2)
+        )
+
+        count = count_a + count_b
+        delta = mean_b - mean_a
+        # share of the combined count coming from the batch, 0 for columns never observed
+        ratio = (count_b / count).fillna(0.0)
+
+        self.count = count
+        self._mean = mean_a + delta * ratio
+        self._m2 = m2_a + m2_b + delta ** 2 * count_a * ratio
+
+    @property
+    def mean(self) -> pd.Series:
+        return self._mean.where(self.count > 0)
+
+    @property
+    def variance(self) -> pd.Series:
+        """
+        Sample variance (ddof=1), as computed by pandas
+        """
+        return (self._m2 / (self.count - 1)).where(self.count > 1)
+
+    @property
+    def std(self) -> pd.Series:
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch of a single column. Keeps a hierarchy of
+    compactors where an item on level h stands for 2**h values, so
+    memory stays around 3k items whatever the number of values seen.
+    Sketches built on separate batches or workers can be merged.
+    """
+
+    def __init__(self, k: int = 200, seed: int = None):
+        """
+        :param k: accuracy parameter, rank error is roughly 1.7/k
+        :param seed: seed of the coin flips used by the compactions
+        """
+        self.k = k
+        self.count = 0
+        self.compactors = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        """
+        Adds a batch of values, missing values are ignored
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        """
+        Merges the sketch of another batch or worker into this one
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while sum(len(items) for items in self.compactors) > sum(
+                self._capacity(level) for level in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    break
+            if level + 1 == len(self.compactors):
+                self.compactors.append(np.empty(0))
+
+            items = np.sort(items)
+            # an odd item out stays on its level so the total weight is preserved
+            kept = items[len(items) - len(items) % 2:]
+            promoted = items[self._rng.integers(2):len(items) - len(items) % 2:2]
+            self.compactors[level] = kept
+            self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+
+    def quantile(self, q):
+        """
+        Estimated q-quantile(s) of the values seen so far, NaN if there were none
+        """
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([
+            np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.compactors)
+        ])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side="left")
+        return items[order][np.minimum(positions, len(items) - 1)]
+
+
+class ColumnQuantileSketch:
+    """
+    One QuantileSketch per column of a frame
+    """
+
+    def __init__(self, k: int = 200, seed: int = None):
+        self.k = k
+        self.seed = seed
+        self.sketches = {}
+
+    def update(self, df: pd.DataFrame):
+        """
+        Folds a batch of numeric columns into the sketches
+        """
+        for column in df.columns:
+            if column not in self.sketches:
+                self.sketches[column] = QuantileSketch(self.k, self.seed)
+            self.sketches[column].update(df[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def merge(self, other: "ColumnQuantileSketch"):
+        """
+        Merges the sketches of another worker into this one
+        """
+        for column, sketch in other.sketches.items():
+            if column in self.sketches:
+                self.sketches[column].merge(sketch)
+            else:
+                self.sketches[column] = sketch
+        return self
+
+    def quantile(self, q: float) -> pd.Series:
+        """
+        Estimated q-quantile of every column
+        """
+        return pd.Series(
+            {column: sketch.quantile(q) for column, sketch in self.sketches.items()}, dtype="float64"
+        )
+
+
+class ValueCounts:
+    """
+    Per-column count map of the observed values, used for the mode
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, df: pd.DataFrame):
+        """
+        Folds a batch into the count maps, missing values are ignored
+        """
+        for column in df.columns:
+            batch_counts = df[column].value_counts(dropna=True)
+            # categoricals also report their unobserved levels
+            batch_counts = batch_counts[batch_counts > 0]
+            if column in self.counts:
+                self.counts[column] = self.counts[column].add(batch_counts, fill_value=0)
+            else:
+                self.counts[column] = batch_counts
+        return self
+
+    def merge(self, other: "ValueCounts"):
+        """
+        Merges the count maps of another worker into this one
+        """
+        for column, counts in other.counts.items():
+            if column in self.counts:
+                self.counts[column] = self.counts[column].add(counts, fill_value=0)
+            else:
+                self.counts[column] = counts
+        return self
+
+    def mode(self) -> pd.Series:
+        """
+        Most frequent value of every column, the smallest one on ties as pandas does
+        """
+        return pd.Series({
+            column: counts.sort_index().idxmax()
+            for column, counts in self.counts.items() if len(counts)
+        }, dtype=object)
@@ -0,0 +1,49 @@
+import mlflow
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from src.cross_validation import cross_validate_models, summarize_cross_validation
+from src.data_splitter import DataSplitter, DataSplittingStrategy, KFoldStrategy
+from steps.model_building_step import build_preprocessor
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def cross_validation_step(df: pd.DataFrame, target_column: str, models: dict = None,
+                          splitting_strategy: DataSplittingStrategy = None, sparse_output: bool = False,
+                          max_workers: int = None, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Cross-validates several regression models on the same folds, with
+    the preprocessing of every fold fitted once and shared by the models.
+
+    :param df: dataframe with the features and the target.
+    :param target_column: name of the target column.
+    :param models: unfitted regressors by name, linear regression and decision tree by default.
+    :param splitting_strategy: strategy generating the folds, 5-fold by default.
+    :param sparse_output: keep the one-hot encoded features sparse.
+    :param max_workers: number of folds processed concurrently.
+    :param cache_dir: directory caching the fitted fold transforms across runs.
+
+    :return: mean and standard deviation of the metrics of every model.
+    """
+    if models is None:
+        models = {"linear_regression": LinearRegression(), "decision_tree": DecisionTreeRegressor()}
+    splitter = DataSplitter(strategy=splitting_strategy or KFoldStrategy())
+
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    results = cross_validate_models(
+        X, y, splitter.split_indices(df, target_column), build_preprocessor(X, sparse_output=sparse_output),
+        models, max_workers=max_workers, cache_dir=cache_dir
+    )
+    summary = summarize_cross_validation(results)
+    logging.info(f"Cross-validation results:\n{summary}")
+
+    if mlflow.active_run():
+        for model, metrics in summary.iterrows():
+            for (metric, statistic), value in metrics.items():
+                mlflow.log_metric(f"cv {model} {metric} {statistic}", value)
+
+    return summary
@@ -1,4 +1,6 @@
 import os
+
+import mlflow
 from src.ingest_data import (
     DataIngestorFactory
 )
@@ -7,23 +9,121 @@ import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def data_ingestion_step(file_path: str):
+def model_input_columns(model_uri: str) -> list:
+    """
+    Reads the input column names from the signature of a logged model
+
+    :param model_uri: URI of the model, e.g. models:/house_price_prediction_lr/1
+    :return: list of column names the model expects
+    """
+    signature = mlflow.models.get_model_info(model_uri).signature
+    if signature is None:
+        raise ValueError(f"Model {model_uri} was logged without a signature.")
+    return signature.inputs.input_names()
+
+
+def derives_from(name: str, column: str) -> bool:
+    """
+    Tells whether a model input column is the source column itself or one
+    of its engineered columns, i.e. a one-hot "<column>_<level>" or a hashed
+    "<prefix>_hash_<i>" whose prefix joins the column with the other hashed ones
+    """
+    if name == column or name.startswith(f"{column}_"):
+        return True
+    prefix = name.split("_hash_")[0]
+    return f"_{column}_" in f"_{prefix}_"
+
+
+def projected_columns(columns: list = None, model_uri: str = None, header: list = None):
+    """
+    Combines the explicitly requested columns with the input columns
+    of the model, None meaning that every column is read
+
+    :param columns: columns requested on top of the model inputs
+    :param model_uri: model whose input signature selects the columns
+    :param header: column names of the source, the signature is mapped onto
+                   them as it names the engineered columns rather than the raw ones
+    :return: list of columns to read, or None for every column
+    """
+    if model_uri is None:
+        return columns
+    signature_columns = model_input_columns(model_uri)
+    if header is not None:
+        signature_columns = [
+            column for column in header
+            if any(derives_from(name, column) for name in signature_columns)
+        ]
+    # the signature only covers model inputs, extra columns (e.g. the target) are kept on top
+    extra_columns = [column for column in columns or [] if column not in signature_columns]
+    return signature_columns + extra_columns
+
+
+def projected_ingestor(file_path: str, cache_dir: str = None, schema_path: str = None,
+                       columns: list = None, model_uri: str = None):
+    """
+    Builds the data ingestor for the file, reading only the projected columns
+
+    :param file_path: path to the data file
+    :param cache_dir: directory of the columnar ingestion cache, disabled if None
+    :param schema_path: path of the persisted ingestion schema, pandas defaults if None
+    :param columns: columns to read, every column if None
+    :param model_uri: model whose input signature adds to the columns to read
+    :return: DataIngestor for the file extension
+    """
+    file_extension = os.path.splitext(file_path)[1]
+    if model_uri is not None:
+        # only the header is parsed to map the signature onto the source columns
+        header = DataIngestorFactory.get_data_ingestor(file_extension, schema_path=schema_path).header(file_path)
+        columns = projected_columns(columns, model_uri, header)
+    return DataIngestorFactory.get_data_ingestor(
+        file_extension, cache_dir=cache_dir, schema_path=schema_path, columns=columns
+    )
+
+
+def data_ingestion_step(file_path: str, cache_dir: str = None, schema_path: str = None,
+                        columns: list = None, model_uri: str = None):
     """
     Initiate the respective data ingestor based on the
     extension of the file from the provided file path
     and reads in data using the ingestor
 
     :param file_path: path to the data file
+    :param cache_dir: directory of the columnar ingestion cache, disabled if None
+    :param schema_path: path of the persisted ingestion schema, pandas defaults if None
+    :param columns: columns to read, every column if None
+    :param model_uri: model whose input signature adds to the columns to read
     :return: dataframe containing data from file
     """
 
     logging.info(f"Loading data from path: {file_path}")
 
-    file_extension = os.path.splitext(file_path)[1]
-    data_ingestor = DataIngestorFactory.get_data_ingestor(file_extension)
+    data_ingestor = projected_ingestor(file_path, cache_dir, schema_path, columns, model_uri)
     data = data_ingestor.ingest(file_path)
 
     logging.info("Data loaded")
 
     return data
 
+
+def data_chunks_ingestion_step(file_path: str, chunksize: int,
+                               cache_dir: str = None, schema_path: str = None,
+                               columns: list = None, model_uri: str = None):
+    """
+    Streaming counterpart of data_ingestion_step that reads in
+    data batch by batch instead of materializing the whole file
+
+    :param file_path: path to the data file
+    :param chunksize: number of rows per batch
+    :param cache_dir: directory of the columnar ingestion cache, disabled if None
+    :param schema_path: path of the persisted ingestion schema, pandas defaults if None
+    :param columns: columns to read, every column if None
+    :param model_uri: model whose input signature adds to the columns to read
+    :return: generator of dataframes with at most chunksize rows each
+    """
+
+    logging.info(f"Loading data from path: {file_path} in chunks of {chunksize} rows")
+
+    data_ingestor = projected_ingestor(file_path, cache_dir, schema_path, columns, model_uri)
+    yield from data_ingestor.ingest_chunks(file_path, chunksize)
+
+    logging.info("Data loaded")
@@ -1,21 +1,41 @@
 from typing import Tuple
 import pandas as pd
-from src.data_splitter import DataSplitter, SimpleTrainTestSplitStrategy
+from src.data_splitter import (
+    DataSplitter,
+    GroupedSplitStrategy,
+    SimpleTrainTestSplitStrategy,
+    StratifiedSplitStrategy,
+    TimeOrderedSplitStrategy
+)
 import mlflow
 import logging
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def data_splitter_step(
-        df: pd.DataFrame, target_column: str
+        df: pd.DataFrame, target_column: str, strategy: str = "simple", **strategy_params
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
     """
     Splits the data into training and testing sets using the DataSplitter
+
+    :param strategy: "simple", "time", "group" or "stratified"
+    :param strategy_params: parameters of the strategy, e.g. test_size or index_path
     """
     logging.info("Starting data splitting step...")
 
+    if strategy == "simple":
+        splitting_strategy = SimpleTrainTestSplitStrategy(**strategy_params)
+    elif strategy == "time":
+        splitting_strategy = TimeOrderedSplitStrategy(**strategy_params)
+    elif strategy == "group":
+        splitting_strategy = GroupedSplitStrategy(**strategy_params)
+    elif strategy == "stratified":
+        splitting_strategy = StratifiedSplitStrategy(**strategy_params)
+    else:
+        raise ValueError(f"Unsupported data splitting strategy: {strategy}")
+
     # Initialize the DataSplitter with the specified strategy
-    splitter = DataSplitter(strategy=SimpleTrainTestSplitStrategy())
+    splitter = DataSplitter(strategy=splitting_strategy)
 
     # Perform the split
     X_train, X_test, y_train, y_test = splitter.split(df, target_column)
@@ -24,6 +44,7 @@ def data_splitter_step(
 
     # Log the split details to MLflow
     mlflow.log_param("target_column", target_column)
+    mlflow.log_param("split_strategy", strategy)
     mlflow.log_param("X_train_shape", X_train.shape)
     mlflow.log_param("X_test_shape", X_test.shape)
     mlflow.log_param("y_train_shape", y_train.shape)
@@ -1,6 +1,12 @@
+import os
+import tempfile
+
 import pandas as pd
 from src.feature_engineering import (
+    CompositeFeatureEngineering,
     FeatureEngineer,
+    FeatureEngineeringStrategy,
+    HashingEncoding,
     LogTransformation,
     StandardScaling,
     MinMaxScaling,
@@ -12,28 +18,78 @@ import mlflow
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# the fitted transform plan is logged under this path of the MLflow run
+FEATURE_ENGINEERING_ARTIFACT = "preprocessing/feature_engineering.joblib"
 
-def apply_feature_engineering(df: pd.DataFrame, strategy: str,
-                              features: list, noise_features : list = None) -> pd.DataFrame:
-    if noise_features is None:
-        noise_features = []
-    logging.info(f"Starting feature engineering with strategy: {strategy} on features: {features}")
 
+def build_feature_engineering_strategy(strategy: str, features: list) -> FeatureEngineeringStrategy:
     if features is None:
         features = []
 
     if strategy == "log":
-        engineer = FeatureEngineer(LogTransformation(features), noise_features)
+        return LogTransformation(features)
     elif strategy == "standard":
-        engineer = FeatureEngineer(StandardScaling(features), noise_features)
+        return StandardScaling(features)
     elif strategy == "minmax":
-        engineer = FeatureEngineer(MinMaxScaling(features), noise_features)
+        return MinMaxScaling(features)
     elif strategy == "encoding":
-        engineer = FeatureEngineer(OneHotEncoding(features), noise_features)
-    else:
-        raise ValueError(f"Unsupported feature engineering strategy: {strategy}")
+        return OneHotEncoding(features)
+    elif strategy == "hashing":
+        return HashingEncoding(features)
+    raise ValueError(f"Unsupported feature engineering strategy: {strategy}")
+
+
+def log_feature_engineer(engineer: FeatureEngineer):
+    """
+    Persists the fitted plan so serving applies the same transformation
+    """
+    if mlflow.active_run():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            plan_path = os.path.join(temp_dir, os.path.basename(FEATURE_ENGINEERING_ARTIFACT))
+            engineer.save(plan_path)
+            mlflow.log_artifact(plan_path, artifact_path=os.path.dirname(FEATURE_ENGINEERING_ARTIFACT))
+
+
+def apply_feature_engineering(df: pd.DataFrame, strategy: str,
+                              features: list, noise_features : list = None,
+                              max_workers: int = None) -> pd.DataFrame:
+    if noise_features is None:
+        noise_features = []
+    logging.info(f"Starting feature engineering with strategy: {strategy} on features: {features}")
+
+    engineer = FeatureEngineer(build_feature_engineering_strategy(strategy, features), noise_features,
+                               max_workers=max_workers)
+
+    transformed_df = engineer.apply_feature_engineering(df)
+    log_feature_engineer(engineer)
+
+    logging.info("Feature engineering completed.")
+
+    return transformed_df
+
+
+def apply_feature_engineering_plan(df: pd.DataFrame, plan: list,
+                                   noise_features: list = None, max_workers: int = None) -> pd.DataFrame:
+    """
+    Applies several strategies in order as one fused pass
+
+    :param df: dataframe to transform
+    :param plan: ordered list of (strategy, features) pairs, e.g.
+                 [("log", ["Gr Liv Area"]), ("standard", ["Gr Liv Area", "Lot Area"])]
+    :param noise_features: features dropped before the transformation
+    :param max_workers: threads the column-wise steps are partitioned across, serial if None
+    :return: transformed dataframe
+    """
+    if noise_features is None:
+        noise_features = []
+    logging.info(f"Starting fused feature engineering with plan: {plan}")
+
+    strategies = [build_feature_engineering_strategy(strategy, features) for strategy, features in plan]
+    engineer = FeatureEngineer(CompositeFeatureEngineering(strategies), noise_features,
+                               max_workers=max_workers)
 
     transformed_df = engineer.apply_feature_engineering(df)
+    log_feature_engineer(engineer)
 
     logging.info("Feature engineering completed.")
 
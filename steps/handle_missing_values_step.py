@@ -1,3 +1,5 @@
+from typing import Iterable
+
 import pandas as pd
 from src.handle_missing_values import (
     DropMissingValuesStrategy,
@@ -9,6 +11,10 @@ import mlflow
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# fitted fill values are logged under this path of the MLflow run
+MISSING_VALUES_ARTIFACT = "preprocessing/missing_values.json"
+
+
 def handle_missing_values(df: pd.DataFrame, strategy:str = "mean"):
     """
     Initiate the respective handler based on strategy
@@ -26,5 +32,33 @@ def handle_missing_values(df: pd.DataFrame, strategy:str = "mean"):
         raise ValueError(f"Unsupported missing value handling strategy: {strategy}")
 
     cleaned_df = handler.handle_missing_values(df)
+
+    # persist the learned statistics so serving fills with the same values
+    if isinstance(handler.strategy, FillMissingValuesStrategy) and mlflow.active_run():
+        mlflow.log_dict(handler.strategy.to_dict(), MISSING_VALUES_ARTIFACT)
+
     return cleaned_df
 
+
+
+def fit_missing_values_chunks(chunks: Iterable[pd.DataFrame], strategy: str = "mean"):
+    """
+    Fits the fill values batch by batch for data that does not fit
+    in memory. The returned strategy fills each batch of a second
+    pass over the data through its transform method
+
+    :param chunks: iterable of dataframe batches
+    :param strategy: name of fill strategy
+    :return: fitted FillMissingValuesStrategy
+    """
+    if strategy not in ["mean", "median", "mode", "constant"]:
+        raise ValueError(f"Unsupported streaming missing value handling strategy: {strategy}")
+
+    fill_strategy = FillMissingValuesStrategy(method=strategy)
+    for chunk in chunks:
+        fill_strategy.partial_fit(chunk)
+
+    if mlflow.active_run():
+        mlflow.log_dict(fill_strategy.to_dict(), MISSING_VALUES_ARTIFACT)
+
+    return fill_strategy
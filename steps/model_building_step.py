@@ -1,40 +1,45 @@
+import os
+
 import mlflow
 import pandas as pd
+from joblib import Memory
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
 from sklearn.linear_model import LinearRegression
 
 import logging
 
 from sklearn.tree import DecisionTreeRegressor
+from src.cross_validation import data_fingerprint
+from src.feature_engineering import sparse_columns, sparse_frame_to_csr
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-
-def model_building_step(
-        X_train: pd.DataFrame, y_train: pd.Series
-) -> Pipeline:
+def build_preprocessor(X: pd.DataFrame, sparse_output: bool = False) -> ColumnTransformer:
     """
-    Builds and trains Regression Model using scikit-learn.
+    Builds the unfitted preprocessing of the feature set: mean imputation
+    of the numerical columns, mode imputation and one-hot encoding of
+    the categorical columns. Sparse columns from the feature engineering
+    encoders bypass the imputers and are passed on as CSR.
 
-    :param X_train: feature set for Model training.
-    :param y_train: target/label set for Model training.
+    :param X: feature set the column types are read from.
+    :param sparse_output: keep the one-hot encoded features as a CSR matrix.
 
-    :return: trained scikit-learn Pipeline.
+    :return: unfitted scikit-learn ColumnTransformer.
     """
-    if not isinstance(X_train, pd.DataFrame):
-        raise TypeError("X_train must be a pandas DataFrame.")
-    if not isinstance(y_train, pd.Series):
-        raise TypeError("y_train must be a pandas Series.")
-
-    categorical_columns = X_train.select_dtypes(include=['object', 'category']).columns
-    numerical_columns = X_train.select_dtypes(exclude=['object', 'category']).columns
+    encoded_columns = sparse_columns(X)
+    categorical_columns = X.select_dtypes(include=['object', 'category']).columns
+    numerical_columns = X.select_dtypes(exclude=['object', 'category']).columns.difference(
+        encoded_columns, sort=False
+    )
 
     logging.info(f"Categorical columns: {categorical_columns}")
     logging.info(f"Numerical columns: {numerical_columns}")
+    logging.info(f"Encoded sparse columns: {len(encoded_columns)}")
 
     # Creating the preprocessing pipelines
     logging.info("Initializing the pre-processing pipeline for column transformation.")
@@ -42,17 +47,64 @@ def model_building_step(
     categorical_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=sparse_output))
         ]
     )
 
-    preprocessor = ColumnTransformer(
+    # the imputers would densify pandas sparse columns, encoded ones hold no missing values
+    encoded_transformer = FunctionTransformer(sparse_frame_to_csr, feature_names_out="one-to-one")
+
+    # a threshold of 1 keeps the stacked output sparse whatever its density
+    return ColumnTransformer(
         transformers=[
             ("numerical", numerical_transformer, numerical_columns),
-            ("categorical", categorical_transformer, categorical_columns)
-        ]
+            ("categorical", categorical_transformer, categorical_columns),
+            ("encoded", encoded_transformer, encoded_columns)
+        ],
+        sparse_threshold=1.0 if sparse_output or encoded_columns else 0.0
+    )
+
+
+def fit_preprocessor(preprocessor: ColumnTransformer, X_train: pd.DataFrame, fingerprint: str = None):
+    """
+    Fits a fresh copy of the preprocessor and transforms the train set.
+
+    :param fingerprint: identifies X_train when the call is memoized.
+
+    :return: fitted preprocessor and transformed train set.
+    """
+    preprocessor = clone(preprocessor)
+    return preprocessor, preprocessor.fit_transform(X_train)
+
+
+def model_building_step(
+        X_train: pd.DataFrame, y_train: pd.Series, sparse_output: bool = False, cache_dir: str = None
+) -> Pipeline:
+    """
+    Builds and trains Regression Model using scikit-learn.
+
+    :param X_train: feature set for Model training.
+    :param y_train: target/label set for Model training.
+    :param sparse_output: keep the one-hot encoded features as a CSR matrix
+                          from the preprocessor into the regressor.
+    :param cache_dir: directory memoizing the fitted preprocessor by a fingerprint
+                      of X_train, so retraining on unchanged data skips preprocessing.
+
+    :return: trained scikit-learn Pipeline.
+    """
+    if not isinstance(X_train, pd.DataFrame):
+        raise TypeError("X_train must be a pandas DataFrame.")
+    if not isinstance(y_train, pd.Series):
+        raise TypeError("y_train must be a pandas Series.")
+
+    encoded_columns = sparse_columns(X_train)
+    categorical_columns = X_train.select_dtypes(include=['object', 'category']).columns
+    numerical_columns = X_train.select_dtypes(exclude=['object', 'category']).columns.difference(
+        encoded_columns, sort=False
     )
 
+    preprocessor = build_preprocessor(X_train, sparse_output=sparse_output)
+
     # Creating the training pipeline
     logging.info("Initializing the Model training pipeline with column transformation preprocessing.")
 
@@ -71,21 +123,28 @@ def model_building_step(
     try:
 
         logging.info("Building and training Regression Model.")
-        pipeline.fit(X_train, y_train)  # training the pipeline
+        if cache_dir is None:
+            pipeline.fit(X_train, y_train)  # training the pipeline
+        else:
+            # the frame is keyed by its fingerprint instead of being hashed again by joblib
+            memory = Memory(os.path.join(cache_dir, "preprocessor"), verbose=0)
+            fitted_preprocessor, processed_data = memory.cache(fit_preprocessor, ignore=["X_train"])(
+                preprocessor, X_train, fingerprint=data_fingerprint(X_train)
+            )
+            pipeline.steps[0] = ("preprocessor", fitted_preprocessor)
+            pipeline.named_steps["model"].fit(processed_data, y_train)
         logging.info("Model training completed.")
 
-        #Logging the expected column names
+        #Logging the expected column names, read from the encoder fitted with the pipeline
         onehot_encoder = (
-            pipeline.named_steps["preprocessor"].transformers_[1][1].named_steps["onehot"]
+            pipeline.named_steps["preprocessor"].named_transformers_["categorical"].named_steps["onehot"]
         )
-        onehot_encoder.fit(X_train[categorical_columns])
 
         expected_columns = numerical_columns.tolist() + list(
             onehot_encoder.get_feature_names_out(categorical_columns)
-        )
+        ) + encoded_columns
 
-        processed_data = pipeline.named_steps["preprocessor"].fit_transform(X_train)
-        logging.info(f"Processed_ train data shape: {processed_data.shape}")
+        logging.info(f"Processed_ train data shape: {(len(X_train), len(expected_columns))}")
 
         logging.info(f"Model expects the following columns: {expected_columns}")
         # mlflow.log_param("expected_columns", expected_columns)
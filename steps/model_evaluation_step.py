@@ -28,13 +28,10 @@ def model_evaluation_step(trained_model: Pipeline,
     logging.info("Applying preprocessing to features test-set.")
 
     preprocessor = trained_model.named_steps["preprocessor"]
-    # transforming the X_test data
+    # transforming the X_test data, sparse output is kept as is
+    # since the model was trained on the same preprocessor output
     X_test_processed = preprocessor.transform(X_test)
 
-    # # Check if the processed data is in a sparse matrix format
-    if hasattr(X_test_processed, "toarray"):
-        X_test_processed = X_test_processed.toarray()  # Convert sparse matrix to dense array
-
     evaluator = ModelEvaluator(strategy=RegressionModelEvaluationStrategy())
 
     evaluation_metrics = evaluator.evaluate(
@@ -0,0 +1,56 @@
+import mlflow
+import pandas as pd
+from src.model_building import DecisionTreeRegressionStrategy, LinearRegressionStrategy
+from src.model_sweep import parameter_grid, run_sweep
+from steps.model_building_step import build_preprocessor
+
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+MODEL_STRATEGIES = {
+    "linear_regression": LinearRegressionStrategy,
+    "decision_tree": DecisionTreeRegressionStrategy,
+}
+
+
+def model_sweep_step(X_train: pd.DataFrame, y_train: pd.Series, X_test: pd.DataFrame, y_test: pd.Series,
+                     grid: dict = None, sparse_output: bool = False, max_workers: int = None) -> pd.DataFrame:
+    """
+    Trains every model strategy and hyperparameter combination of the grid
+    concurrently on the same preprocessed data and ranks them.
+
+    :param X_train: feature set for Model training.
+    :param y_train: target/label set for Model training.
+    :param X_test: feature set for Model evaluation.
+    :param y_test: target/label set for Model evaluation.
+    :param grid: hyperparameter lists by pipeline parameter, by strategy name.
+    :param sparse_output: keep the one-hot encoded features sparse.
+    :param max_workers: number of configurations trained concurrently.
+
+    :return: leaderboard of the configurations ranked by R-squared.
+    """
+    if grid is None:
+        grid = {
+            "linear_regression": {"model__fit_intercept": [True, False]},
+            "decision_tree": {"model__max_depth": [4, 8, 12, None], "model__min_samples_leaf": [1, 5, 20]},
+        }
+
+    strategies = []
+    for name, strategy_grid in grid.items():
+        if name not in MODEL_STRATEGIES:
+            raise ValueError(f"Unsupported model strategy: {name}")
+        strategies.extend(parameter_grid(MODEL_STRATEGIES[name], strategy_grid))
+
+    # the preprocessing is fitted once and its output shared by every configuration
+    preprocessor = build_preprocessor(X_train, sparse_output=sparse_output)
+    X_train_processed = preprocessor.fit_transform(X_train)
+    X_test_processed = preprocessor.transform(X_test)
+
+    leaderboard = run_sweep(strategies, X_train_processed, y_train, X_test_processed, y_test,
+                            max_workers=max_workers)
+    logging.info(f"Model sweep leaderboard:\n{leaderboard.head(10)}")
+
+    if mlflow.active_run():
+        mlflow.log_text(leaderboard.to_csv(index=False), "sweep/leaderboard.csv")
+
+    return leaderboard
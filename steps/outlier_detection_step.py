@@ -2,15 +2,19 @@ import pandas as pd
 from src.outlier_detection import (
     OutlierDetector,
     ZScoreOutlierDetection,
-    IQROutlierDetection
+    IQROutlierDetection,
+    IsolationForestOutlierDetection
 )
 import mlflow
 
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# fitted outlier bounds are logged under this path of the MLflow run
+OUTLIER_BOUNDS_ARTIFACT = "preprocessing/outlier_bounds.json"
 
-def outlier_detection_step(df: pd.DataFrame, strategy: str, column_name: str):
+
+def outlier_detection_step(df: pd.DataFrame, strategy: str, column_name: str, approximate: bool = False):
     logging.info(f"Starting outlier detection step with DataFrame column {column_name}")
 
     if df is None:
@@ -25,12 +29,18 @@ def outlier_detection_step(df: pd.DataFrame, strategy: str, column_name: str):
         logging.error(f"Column '{column_name}' does not present exist in DataFrame.")
         raise ValueError(f"Column '{column_name}' does not present exist in DataFrame.")
 
-    df_numeric = df.select_dtypes(include=[int, float])
+    # compact schemas ingest int8/int16/float32 columns, which [int, float] would leave out
+    df_numeric = df.select_dtypes(include="number")
 
     if strategy == "zscore":
         outlier_detector = OutlierDetector(ZScoreOutlierDetection())
     elif strategy == "iqr":
-        outlier_detector = OutlierDetector(IQROutlierDetection())
+        # approximate quantiles come from a KLL sketch instead of full sorts
+        outlier_detector = OutlierDetector(IQROutlierDetection(approximate=approximate),
+                                           approximate_quantiles=approximate)
+    elif strategy == "isolation_forest":
+        # scores whole rows, so combinations of values are caught too
+        outlier_detector = OutlierDetector(IsolationForestOutlierDetection())
     else:
         raise ValueError(f"Unsupported outlier detection strategy: {strategy}")
 
@@ -39,3 +49,29 @@ def outlier_detection_step(df: pd.DataFrame, strategy: str, column_name: str):
     return cleaned_df
 
 
+def fit_outlier_detector(df: pd.DataFrame, strategy: str = "iqr", exclude_columns: list = None):
+    """
+    Fits the per-column outlier bounds on the numeric training features
+    and logs them to the active MLflow run, so serving can clip or flag
+    incoming rows without the training data
+
+    :param df: training dataframe
+    :param strategy: name of the univariate detection strategy
+    :param exclude_columns: columns to leave out, e.g. the target or ids
+    :return: fitted OutlierDetector
+    """
+    if strategy == "zscore":
+        outlier_detector = OutlierDetector(ZScoreOutlierDetection())
+    elif strategy == "iqr":
+        outlier_detector = OutlierDetector(IQROutlierDetection())
+    else:
+        raise ValueError(f"Unsupported outlier detection strategy: {strategy}")
+
+    # compact schemas ingest int8/int16/float32 columns, which [int, float] would leave out
+    df_numeric = df.select_dtypes(include="number").drop(columns=exclude_columns or [], errors="ignore")
+    outlier_detector.fit(df_numeric)
+
+    if mlflow.active_run():
+        mlflow.log_dict(outlier_detector.to_dict(), OUTLIER_BOUNDS_ARTIFACT)
+
+    return outlier_detector